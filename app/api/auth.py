@@ -3,13 +3,15 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Form, Re
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr, Field, ValidationError
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
-from app.utils.security import get_password_hash, authenticate_user, create_access_token
+from app.utils.security import get_password_hash_async, authenticate_user_async, create_access_token, get_user_by_username
+from app.utils.password_pool import PasswordPoolBusy
 from app.config import settings
 from app.utils.logger import get_logger
 
@@ -45,7 +47,7 @@ async def login(
     username: str = Form(...),
     password: str = Form(...),
     remember: Optional[bool] = Form(False),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Process login form submission
@@ -53,7 +55,7 @@ async def login(
     logger.info(f"Login attempt for user: {username}")
     
     try:
-        user = authenticate_user(db, username, password)
+        user = await authenticate_user_async(db, username, password)
         
         if not user:
             logger.warning(f"Failed login attempt for user: {username}")
@@ -87,6 +89,13 @@ async def login(
         
         return response
         
+    except PasswordPoolBusy:
+        logger.warning(f"Login for user {username} turned away: password hashing queue is full")
+        return templates.TemplateResponse(
+            "auth/login.html", 
+            {"request": request, "error": "The server is busy. Please try again in a moment."},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     except Exception as e:
         logger.error(f"Login error for user {username}: {str(e)}", exc_info=True)
         # Return to login page with error
@@ -103,7 +112,7 @@ async def create_user(
     full_name: str = Form(...),
     password: str = Form(...),
     confirm_password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info(f"Signup attempt for username: {username}, email: {email}")
     try:
@@ -131,7 +140,7 @@ async def create_user(
             )
         
         # Check if username already exists
-        existing_user = db.query(User).filter(User.username == username).first()
+        existing_user = await get_user_by_username(db, username)
         if existing_user:
             logger.warning(f"Signup failed: Username {username} already exists")
             return templates.TemplateResponse(
@@ -140,7 +149,7 @@ async def create_user(
             )
         
         # Check if email already exists
-        existing_email = db.query(User).filter(User.email == email).first()
+        existing_email = (await db.execute(select(User).where(User.email == email))).scalars().first()
         if existing_email:
             logger.warning(f"Signup failed: Email {email} already exists")
             return templates.TemplateResponse(
@@ -149,7 +158,7 @@ async def create_user(
             )
         
         # Create new user
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash_async(password)
         db_user = User(
             username=username,
             email=email,
@@ -157,13 +166,20 @@ async def create_user(
             hashed_password=hashed_password
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         logger.info(f"User created successfully: {username}")
         
         # Redirect to login page
         return RedirectResponse(url="/auth/login?registered=true", status_code=status.HTTP_303_SEE_OTHER)
+    except PasswordPoolBusy:
+        logger.warning(f"Signup for {username} turned away: password hashing queue is full")
+        return templates.TemplateResponse(
+            "auth/signup.html", 
+            {"request": request, "error": "The server is busy. Please try again in a moment."},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     except Exception as e:
         logger.error(f"User creation error for {username}: {str(e)}", exc_info=True)
         return templates.TemplateResponse(
@@ -188,11 +204,11 @@ async def logout():
 async def login_for_access_token(
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         logger.info(f"API token request for user: {form_data.username}")
-        user = authenticate_user(db, form_data.username, form_data.password)
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
         if not user:
             logger.warning(f"API token request failed for user: {form_data.username}")
             raise HTTPException(
@@ -210,6 +226,13 @@ async def login_for_access_token(
         return {"access_token": access_token, "token_type": "bearer"}
     except HTTPException:
         raise
+    except PasswordPoolBusy:
+        logger.warning(f"API token request for {form_data.username} turned away: password hashing queue is full")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again later",
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         logger.error(f"API token error for {form_data.username}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -1,11 +1,17 @@
 # app/api/trending.py (Updated)
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from app.database import get_db
+from typing import Optional
+from app.database import get_async_db, AsyncSessionLocal
+from app.models.user import User
+from app.utils.security import get_optional_user
 from app.utils.logger import get_logger
-from app.services.youtube_service import YouTubeService
+from app.services.youtube_service import AsyncYouTubeService, normalize_query
 from app.entrypoint_agent.llm_handler import LLMHandler
+from app.entrypoint_agent.agent import TrendingVideoAgent
+from app.utils.swr import StaleWhileRevalidateCache
 import json
 
 logger = get_logger(__name__)
@@ -15,8 +21,11 @@ class TrendingRequest(BaseModel):
     prompt: str
 
 # Initialize the services
-youtube_service = YouTubeService()
+youtube_service = AsyncYouTubeService()
 llm_handler = LLMHandler()
+trending_agent = TrendingVideoAgent(youtube_service, llm_handler)
+# Ranked videos per category for /analyze, served stale while refreshing
+analyze_results = StaleWhileRevalidateCache(name="analyze_results")
 
 # @router.post("/analyze")
 # async def analyze_trending(
@@ -129,7 +138,8 @@ llm_handler = LLMHandler()
 async def analyze_trending(
     request_data: TrendingRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_optional_user)
 ):
     """
     Analyze trending videos based on the user's prompt
@@ -140,10 +150,14 @@ async def analyze_trending(
         # Extract category from prompt
         category = request_data.prompt.strip()
         
-        # Fetch videos
-        videos = youtube_service.get_trending_videos(category, max_results=20)
+        # Fetch, rank and format videos (served from the cache when recent,
+        # or stale while a background refresh runs)
+        result = await analyze_results.get(
+            normalize_query(category), _fetch_ranked_videos, category,
+            tier=analyze_results.tier_for(category)
+        )
         
-        if not videos:
+        if result is None:
             logger.warning(f"No videos found for category: {category}")
             return {
                 "success": False,
@@ -151,26 +165,7 @@ async def analyze_trending(
                 "category": category
             }
         
-        # Analyze and rank videos
-        ranked_videos = youtube_service.analyze_engagement(videos)
-        
-        # Format videos for frontend
-        formatted_videos = []
-        for video in ranked_videos:
-            snippet = video.get('snippet', {})
-            stats = video.get('statistics', {})
-            
-            formatted_videos.append({
-                "id": video.get('id'),
-                "title": snippet.get('title', 'Untitled'),
-                "channelTitle": snippet.get('channelTitle', 'Unknown Channel'),
-                "publishedAt": snippet.get('publishedAt', ''),
-                "thumbnail": snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                "viewCount": int(stats.get('viewCount', 0)),
-                "likeCount": int(stats.get('likeCount', 0)),
-                "commentCount": int(stats.get('commentCount', 0)),
-                "engagementScore": video.get('engagement', {}).get('score', 0)
-            })
+        videos, formatted_videos = result
         
         # Generate analysis
         trend_analysis = {
@@ -183,27 +178,7 @@ async def analyze_trending(
         
         # Try to store in database if user is authenticated
         try:
-            # Try to get user ID from token (safer than accessing session)
-            user_id = None
-            token = request.cookies.get("access_token")
-            
-            if token and token.startswith("Bearer "):
-                # Extract token
-                token = token.replace("Bearer ", "")
-                
-                # Decode token to get user ID
-                from app.utils.security import decode_access_token
-                payload = decode_access_token(token)
-                
-                if payload:
-                    # Get username from token
-                    username = payload.get("sub")
-                    
-                    # Look up user in database
-                    if username:
-                        user = db.query(User).filter(User.username == username).first()
-                        if user:
-                            user_id = user.id
+            user_id = current_user.id if current_user else None
             
             # If we have a user ID, store the analysis
             if user_id:
@@ -220,7 +195,7 @@ async def analyze_trending(
                     recommendations=trend_analysis.get('recommendations', ''),
                     metrics=json.dumps({
                         "video_count": len(videos),
-                        "avg_views": sum(int(v.get('statistics', {}).get('viewCount', 0)) for v in videos) / len(videos) if videos else 0,
+                        "avg_views": sum(v.view_count for v in videos) / len(videos) if videos else 0,
                     }),
                     full_response=json.dumps({
                         "category": category,
@@ -230,7 +205,7 @@ async def analyze_trending(
                 )
                 
                 db.add(db_analysis)
-                db.commit()
+                await db.commit()
                 logger.info(f"Stored trend analysis in database")
         except Exception as e:
             logger.error(f"Error storing trend analysis: {str(e)}")
@@ -249,4 +224,71 @@ async def analyze_trending(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+async def _fetch_ranked_videos(category):
+    """
+    Fetch and rank trending videos for a category
+    
+    Returns:
+        tuple: (videos, formatted_videos), or None when no videos were found
+    """
+    videos = await youtube_service.get_trending_videos(category, max_results=20)
+    if not videos:
+        return None
+    ranked_videos = youtube_service.analyze_engagement(videos)
+    return videos, [video.to_dict() for video in ranked_videos]
+
+
+async def precompute_analyze_results(prompt):
+    """
+    Refresh the /analyze result for a prompt ahead of demand (called by
+    TrendPrecomputeScheduler)
+    
+    Returns:
+        bool: True if a result was stored
+    """
+    category = prompt.strip()
+    result = await analyze_results.fill(
+        normalize_query(category), analyze_results.tier_for(category), _fetch_ranked_videos, category
+    )
+    return result is not None
+
+
+@router.post("/analyze/stream")
+async def analyze_trending_stream(
+    request_data: TrendingRequest,
+    request: Request,
+    current_user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Stream a trend analysis as Server-Sent Events.
+    
+    Emits "category", then "videos" as soon as they are ranked, then "token"
+    events with the LLM analysis as it is generated, "analysis" with the
+    parsed result and finally "done" with the stored analysis ID.
+    """
+    user_id = current_user.id if current_user else None
+    logger.info(f"Streaming trend analysis for prompt: {request_data.prompt}")
+    
+    async def event_stream():
+        # The request-scoped session may be closed before the stream ends,
+        # so the stream uses its own
+        async with AsyncSessionLocal() as stream_db:
+            async for event, data in trending_agent.stream_query(request_data.prompt, user_id, stream_db):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/quota")
+async def youtube_quota():
+    """
+    Report YouTube API quota usage and remaining units in the rolling window
+    """
+    return youtube_service.quota_stats()
@@ -12,11 +12,32 @@ class Settings(BaseSettings):
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
     DB_PORT: str = os.getenv("DB_PORT", "3306")
     DB_NAME: str = os.getenv("DB_NAME", "content_creator_db")
+    # Async driver for the request path (aiomysql or asyncmy); set
+    # ASYNC_DATABASE_URL to override, e.g. sqlite+aiosqlite:///./dev.db
+    DB_ASYNC_DRIVER: str = os.getenv("DB_ASYNC_DRIVER", "aiomysql")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # Connection pool; keep DB_POOL_RECYCLE below MySQL's wait_timeout
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+    # Checkouts that wait longer than this are logged
+    DB_POOL_SLOW_WAIT_MS: float = float(os.getenv("DB_POOL_SLOW_WAIT_MS", "100"))
     
     # Security settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "default-secret-key-change-this")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # bcrypt worker threads (0 = min(4, CPU count)) and the most operations
+    # allowed to run or wait at once before logins are turned away
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    # Authenticated user lookups are cached for this many seconds
+    USER_CACHE_TTL: int = int(os.getenv("USER_CACHE_TTL", "60"))
+    USER_CACHE_MAX_ENTRIES: int = int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096"))
+    # Users allowed to use the admin endpoints, comma-separated
+    ADMIN_USERNAMES: str = os.getenv("ADMIN_USERNAMES", "")
     
     # Application settings
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
@@ -25,6 +46,76 @@ class Settings(BaseSettings):
     YOUTUBE_API_KEY: str = os.getenv("YOUTUBE_API_KEY", "")
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
+    # OpenAI client settings
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "30"))
+    OPENAI_MAX_CONCURRENCY: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+    OPENAI_RETRY_BASE_DELAY: float = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))
+    
+    # Category extraction cache
+    CATEGORY_CACHE_MAX_ENTRIES: int = int(os.getenv("CATEGORY_CACHE_MAX_ENTRIES", "2048"))
+    CATEGORY_CACHE_TTL: int = int(os.getenv("CATEGORY_CACHE_TTL", "86400"))
+    # Opt-in: near-miss prompts reuse a cached category, which can be wrong
+    CATEGORY_CACHE_SIMILARITY: bool = os.getenv("CATEGORY_CACHE_SIMILARITY", "False").lower() == "true"
+    CATEGORY_CACHE_SIMILARITY_THRESHOLD: float = float(os.getenv("CATEGORY_CACHE_SIMILARITY_THRESHOLD", "0.9"))
+    
+    # Trend analysis cache ("memory" or "database"; the database backend uses
+    # ANALYSIS_CACHE_DATABASE_URL if set, e.g. sqlite:///./analysis_cache.db,
+    # and the application database otherwise)
+    ANALYSIS_CACHE_BACKEND: str = os.getenv("ANALYSIS_CACHE_BACKEND", "memory")
+    ANALYSIS_CACHE_DATABASE_URL: str = os.getenv("ANALYSIS_CACHE_DATABASE_URL", "")
+    ANALYSIS_CACHE_TTL: int = int(os.getenv("ANALYSIS_CACHE_TTL", "3600"))
+    ANALYSIS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1024"))
+    
+    # Trend analysis prompt size
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+    PROMPT_MAX_VIDEOS: int = int(os.getenv("PROMPT_MAX_VIDEOS", "25"))
+    PROMPT_MAX_TITLE_CHARS: int = int(os.getenv("PROMPT_MAX_TITLE_CHARS", "70"))
+    
+    # YouTube client settings
+    YOUTUBE_MAX_WORKERS: int = int(os.getenv("YOUTUBE_MAX_WORKERS", "8"))
+    YOUTUBE_REQUEST_TIMEOUT: float = float(os.getenv("YOUTUBE_REQUEST_TIMEOUT", "10"))
+    YOUTUBE_REGION: str = os.getenv("YOUTUBE_REGION", "US")
+    YOUTUBE_LANGUAGE: str = os.getenv("YOUTUBE_LANGUAGE", "en")
+    YOUTUBE_CACHE_TTL: int = int(os.getenv("YOUTUBE_CACHE_TTL", "300"))
+    YOUTUBE_CACHE_MAX_ENTRIES: int = int(os.getenv("YOUTUBE_CACHE_MAX_ENTRIES", "512"))
+    YOUTUBE_VIDEO_CACHE_TTL: int = int(os.getenv("YOUTUBE_VIDEO_CACHE_TTL", "600"))
+    YOUTUBE_VIDEO_CACHE_MAX_ENTRIES: int = int(os.getenv("YOUTUBE_VIDEO_CACHE_MAX_ENTRIES", "10000"))
+    # Opt-in: run fallback searches concurrently, capped at this many extra units per hour
+    YOUTUBE_SPECULATIVE_SEARCH: bool = os.getenv("YOUTUBE_SPECULATIVE_SEARCH", "False").lower() == "true"
+    YOUTUBE_SPECULATIVE_UNIT_BUDGET: int = int(os.getenv("YOUTUBE_SPECULATIVE_UNIT_BUDGET", "1000"))
+    # Daily unit quota, tracked over a rolling window; below the low watermark
+    # (a fraction of the quota) stale results are preferred over new calls.
+    # The quota is tracked per worker process, so divide the project's daily
+    # quota by the worker count
+    YOUTUBE_DAILY_QUOTA: int = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+    YOUTUBE_QUOTA_WINDOW: int = int(os.getenv("YOUTUBE_QUOTA_WINDOW", "86400"))
+    YOUTUBE_QUOTA_LOW_WATERMARK: float = float(os.getenv("YOUTUBE_QUOTA_LOW_WATERMARK", "0.2"))
+    YOUTUBE_STALE_TTL: int = int(os.getenv("YOUTUBE_STALE_TTL", "86400"))
+    YOUTUBE_STALE_MAX_ENTRIES: int = int(os.getenv("YOUTUBE_STALE_MAX_ENTRIES", "20000"))
+    
+    # Engagement scoring weights
+    ENGAGEMENT_VIEW_WEIGHT: float = float(os.getenv("ENGAGEMENT_VIEW_WEIGHT", "0.4"))
+    ENGAGEMENT_LIKE_WEIGHT: float = float(os.getenv("ENGAGEMENT_LIKE_WEIGHT", "0.3"))
+    ENGAGEMENT_COMMENT_WEIGHT: float = float(os.getenv("ENGAGEMENT_COMMENT_WEIGHT", "0.2"))
+    ENGAGEMENT_RECENCY_WEIGHT: float = float(os.getenv("ENGAGEMENT_RECENCY_WEIGHT", "100000"))
+    ENGAGEMENT_RECENCY_WINDOW_DAYS: float = float(os.getenv("ENGAGEMENT_RECENCY_WINDOW_DAYS", "30"))
+    
+    # Stale-while-revalidate windows for trend results, "tier:fresh:stale"
+    # in seconds; categories are assigned to tiers as "category:tier"
+    SWR_TIER_WINDOWS: str = os.getenv("SWR_TIER_WINDOWS", "default:600:3000,hot:120:1080,evergreen:3600:82800")
+    SWR_CATEGORY_TIERS: str = os.getenv("SWR_CATEGORY_TIERS", "news:hot,sports:hot,esports:hot")
+    SWR_MAX_ENTRIES: int = int(os.getenv("SWR_MAX_ENTRIES", "1024"))
+    
+    # Background precomputation of the most requested /analyze prompts; the
+    # unit budget is per worker process, so divide it by the worker count
+    PRECOMPUTE_ENABLED: bool = os.getenv("PRECOMPUTE_ENABLED", "False").lower() == "true"
+    PRECOMPUTE_INTERVAL: int = int(os.getenv("PRECOMPUTE_INTERVAL", "600"))
+    PRECOMPUTE_TOP_N: int = int(os.getenv("PRECOMPUTE_TOP_N", "10"))
+    PRECOMPUTE_LOOKBACK_HOURS: int = int(os.getenv("PRECOMPUTE_LOOKBACK_HOURS", "24"))
+    PRECOMPUTE_DAILY_UNIT_BUDGET: int = int(os.getenv("PRECOMPUTE_DAILY_UNIT_BUDGET", "3000"))
+    
     # Logging settings
     LOG_LEVEL_NAME: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -33,5 +124,26 @@ class Settings(BaseSettings):
         return getattr(logging, self.LOG_LEVEL_NAME)
     
     LOG_FILE: str = os.getenv("LOG_FILE", "app.log")
+    
+    # Log records are written by a background thread from a bounded queue;
+    # when it is full, records below WARNING are dropped and WARNING and
+    # above wait up to LOG_QUEUE_BLOCK_TIMEOUT seconds first
+    LOG_ASYNC: bool = os.getenv("LOG_ASYNC", "True").lower() == "true"
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_QUEUE_BLOCK_TIMEOUT: float = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "0.05"))
+    # "text" or "json" (JSON lines with request_id, route, user, duration_ms)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text").lower()
+    # Fraction of sub-WARNING records kept per logger, e.g. "db:0.1,app:0.5"
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+    
+    # Opt-in profiling: requests slower than PROFILE_THRESHOLD_MS are saved
+    # with a per-dependency breakdown (plus sampled stacks with
+    # PROFILE_STACK_SAMPLING); only the newest PROFILE_MAX_FILES are kept
+    PROFILE_ENABLED: bool = os.getenv("PROFILE_ENABLED", "False").lower() == "true"
+    PROFILE_THRESHOLD_MS: float = float(os.getenv("PROFILE_THRESHOLD_MS", "2000"))
+    PROFILE_STACK_SAMPLING: bool = os.getenv("PROFILE_STACK_SAMPLING", "False").lower() == "true"
+    PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", os.path.join("logs", "profiles"))
+    PROFILE_MAX_FILES: int = int(os.getenv("PROFILE_MAX_FILES", "50"))
 
 settings = Settings()
\ No newline at end of file
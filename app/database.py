@@ -1,12 +1,24 @@
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.utils.db_pool import PoolMetrics, pool_options
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from app.utils.profiler import attach_engine
 
 # Get logger for this module
 logger = get_logger(__name__)
 
+DB_SESSION_SECONDS = metrics.histogram(
+    "db_session_duration_seconds",
+    "Time a request holds a database session",
+    ("engine",)
+)
+
 try:
     # Create connection URL
     SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
@@ -16,7 +28,10 @@ try:
     logger.info(f"Connecting to database: {masked_url}")
     
     # Create engine
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    sync_pool_metrics = PoolMetrics("sync")
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL, sync_pool_metrics))
+    sync_pool_metrics.attach(engine)
+    attach_engine(engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
     logger.info("Database engine and session maker created successfully")
@@ -24,12 +39,44 @@ except Exception as e:
     logger.critical(f"Failed to connect to database: {str(e)}", exc_info=True)
     raise
 
+try:
+    # Async engine for the request path, so DB I/O in async routes does not
+    # block the event loop
+    ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or f"mysql+{settings.DB_ASYNC_DRIVER}://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    
+    # Log connection attempt (masking password)
+    masked_async_url = make_url(ASYNC_SQLALCHEMY_DATABASE_URL).render_as_string(hide_password=True)
+    logger.info(f"Connecting async engine to database: {masked_async_url}")
+    
+    async_pool_metrics = PoolMetrics("async")
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        **pool_options(ASYNC_SQLALCHEMY_DATABASE_URL, async_pool_metrics, is_async=True)
+    )
+    async_pool_metrics.attach(async_engine)
+    attach_engine(async_engine)
+    # Objects stay usable after commit without another round trip
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    
+    logger.info("Async database engine and session maker created successfully")
+except Exception as e:
+    logger.critical(f"Failed to create async database engine: {str(e)}", exc_info=True)
+    raise
+
 Base = declarative_base()
 
+def pool_stats():
+    """Occupancy and checkout metrics of both connection pools"""
+    return {
+        "sync": sync_pool_metrics.stats(),
+        "async": async_pool_metrics.stats()
+    }
+
 # Dependency to get the database session
 def get_db():
     db = SessionLocal()
     logger.debug("Database session opened")
+    started = time.perf_counter()
     try:
         yield db
     except Exception as e:
@@ -37,4 +84,23 @@ def get_db():
         raise
     finally:
         db.close()
-        logger.debug("Database session closed")
\ No newline at end of file
+        DB_SESSION_SECONDS.labels("sync").observe(time.perf_counter() - started)
+        logger.debug("Database session closed")
+
+# Async dependency to get the database session
+async def get_async_db():
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            logger.debug("Async database session opened")
+            try:
+                yield db
+            except Exception as e:
+                logger.error(f"Database session error: {str(e)}", exc_info=True)
+                await db.rollback()
+                raise
+            finally:
+                logger.debug("Async database session closed")
+    finally:
+        # Sessions that raise are recorded too
+        DB_SESSION_SECONDS.labels("async").observe(time.perf_counter() - started)
\ No newline at end of file
@@ -1,121 +1,177 @@
 # app/entrypoint_agent/agent.py
 import json
 import datetime
-from sqlalchemy.orm import Session
-from app.services.youtube_service import YouTubeService
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.youtube_service import AsyncYouTubeService, normalize_query
 from app.entrypoint_agent.llm_handler import LLMHandler
 from app.models.trend_analysis import TrendAnalysis
 from app.utils.logger import get_logger
+from app.utils.singleflight import SingleFlight
+from app.utils.swr import StaleWhileRevalidateCache, STALE
 
 logger = get_logger(__name__)
 
 class TrendingVideoAgent:
-    def __init__(self):
+    def __init__(self, youtube_service=None, llm_handler=None):
         try:
-            self.youtube_service = YouTubeService()
-            self.llm_handler = LLMHandler()
+            self.youtube_service = youtube_service or AsyncYouTubeService()
+            self.llm_handler = llm_handler or LLMHandler()
+            # Concurrent requests for the same category share one fetch + analysis
+            self.flight = SingleFlight(name="trend_analysis")
+            # (videos, formatted_videos, trend_analysis) per category, served
+            # stale while a background refresh runs
+            self.results = StaleWhileRevalidateCache(name="trend_results")
             logger.info("TrendingVideoAgent initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize TrendingVideoAgent: {str(e)}", exc_info=True)
             raise
     
-    async def process_query(self, user_prompt, user_id, db: Session):
+    async def _compute_result(self, category):
         """
-        Process a user query and return trending videos
+        Fetch, rank and analyze the trending videos for a category
+        
+        Returns:
+            tuple: (videos, formatted_videos, trend_analysis), or None when no
+            videos were found or the analysis failed (so it is not cached)
+        """
+        videos, ranked_videos = await self.flight.do(
+            ("videos", normalize_query(category)), self._fetch_and_rank, category
+        )
+        if not videos:
+            return None
+        
+        analysis_key = ("analysis", normalize_query(category), tuple(video.id for video in ranked_videos[:10]))
+        trend_analysis = await self.flight.do(analysis_key, self.llm_handler.analyze_trends, ranked_videos, category)
+        if self.llm_handler.is_fallback(trend_analysis, category):
+            return None
+        return videos, [video.to_dict() for video in ranked_videos], trend_analysis
+    
+    async def _fetch_and_rank(self, category):
+        """
+        Fetch and rank the trending videos for a category
+        
+        Returns:
+            tuple: (videos, ranked_videos); empty lists when no videos were found
+        """
+        videos = await self.youtube_service.get_trending_videos(category)
+        if not videos:
+            return [], []
+        return videos, self.youtube_service.analyze_engagement(videos)
+    
+    async def stream_query(self, user_prompt, user_id, db: AsyncSession):
+        """
+        Process a user query, streaming the results as they become available.
+        
+        Yields (event, data) pairs: "category", then "videos" once ranked,
+        then "token" for each piece of the LLM analysis, then "analysis" with
+        the parsed result, and finally "done" with the stored analysis ID.
+        
+        Results are cached per category: recent ones are returned directly,
+        and slightly expired ones are returned while a single background
+        refresh replaces them (see StaleWhileRevalidateCache).
         
         Args:
             user_prompt (str): The user's query about trending videos
             user_id (int): The ID of the user making the request
-            db (Session): The database session
-            
-        Returns:
-            dict: The response with trending videos and analysis
+            db (AsyncSession): The database session
         """
         try:
-            logger.info(f"Processing query: '{user_prompt}' for user_id: {user_id}")
+            logger.info(f"Streaming query: '{user_prompt}' for user_id: {user_id}")
             
             # 1. Extract category from user prompt
-            category = self.llm_handler.extract_category(user_prompt)
+            category = await self.llm_handler.extract_category(user_prompt)
+            yield "category", {"category": category}
+            
+            result_key = normalize_query(category)
+            tier = self.results.tier_for(category)
+            cached, state = self.results.lookup(result_key)
+            if cached is not None:
+                if state == STALE:
+                    self.results.revalidate(result_key, tier, self._compute_result, category)
+                videos, formatted_videos, trend_analysis = cached
+                yield "videos", {"category": category, "videos": formatted_videos}
+                yield "analysis", trend_analysis
+                db_analysis = await self._store_analysis(
+                    db, user_prompt, user_id, category, videos, formatted_videos, trend_analysis
+                )
+                yield "done", {"success": True, "analysis_id": db_analysis.id}
+                return
             
             # 2. Fetch trending videos from YouTube
-            videos = self.youtube_service.get_trending_videos(category)
+            videos = await self.youtube_service.get_trending_videos(category)
             
             if not videos:
                 logger.warning(f"No videos found for category: {category}")
-                return {
+                yield "done", {
                     "success": False,
                     "message": f"No trending videos found for '{category}'",
-                    "category": category,
-                    "videos": []
+                    "category": category
                 }
+                return
             
-            # 3. Analyze engagement and rank videos
+            # 3. Analyze engagement and rank videos, send them right away
             ranked_videos = self.youtube_service.analyze_engagement(videos)
+            formatted_videos = [video.to_dict() for video in ranked_videos]
+            yield "videos", {"category": category, "videos": formatted_videos}
             
-            # 4. Analyze trends using LLM
-            trend_analysis = self.llm_handler.analyze_trends(ranked_videos, category)
-            
-            # 5. Format response for frontend
-            formatted_videos = []
-            for video in ranked_videos:
-                snippet = video.get('snippet', {})
-                stats = video.get('statistics', {})
-                
-                formatted_videos.append({
-                    "id": video.get('id'),
-                    "title": snippet.get('title'),
-                    "channelTitle": snippet.get('channelTitle'),
-                    "publishedAt": snippet.get('publishedAt'),
-                    "thumbnail": snippet.get('thumbnails', {}).get('high', {}).get('url'),
-                    "viewCount": stats.get('viewCount'),
-                    "likeCount": stats.get('likeCount'),
-                    "commentCount": stats.get('commentCount'),
-                    "engagementScore": video.get('engagement', {}).get('score', 0)
-                })
+            # 4. Stream the LLM analysis
+            trend_analysis = None
+            async for kind, payload in self.llm_handler.stream_trends(ranked_videos, category):
+                if kind == "token":
+                    yield "token", {"text": payload}
+                else:
+                    trend_analysis = payload
+            yield "analysis", trend_analysis
+            if not self.llm_handler.is_fallback(trend_analysis, category):
+                self.results.set(result_key, (videos, formatted_videos, trend_analysis), tier)
             
-            # 6. Store analysis in database
-            db_analysis = TrendAnalysis(
-                user_id=user_id,
-                query=user_prompt,
-                platform="youtube",
-                trend_strength=float(trend_analysis.get('trend_strength', 5)),
-                trend_direction=trend_analysis.get('trend_direction', 'stable'),
-                summary=trend_analysis.get('summary', ''),
-                insights=trend_analysis.get('insights', ''),
-                recommendations=trend_analysis.get('recommendations', ''),
-                metrics=json.dumps({
-                    "video_count": len(videos),
-                    "avg_views": sum(int(v.get('statistics', {}).get('viewCount', 0)) for v in videos) / len(videos) if videos else 0,
-                    "avg_likes": sum(int(v.get('statistics', {}).get('likeCount', 0)) for v in videos) / len(videos) if videos else 0,
-                    "avg_comments": sum(int(v.get('statistics', {}).get('commentCount', 0)) for v in videos) / len(videos) if videos else 0
-                }),
-                full_response=json.dumps({
-                    "category": category,
-                    "videos": formatted_videos,
-                    "analysis": trend_analysis
-                })
+            # 5. Store analysis in database
+            db_analysis = await self._store_analysis(
+                db, user_prompt, user_id, category, videos, formatted_videos, trend_analysis
             )
             
-            db.add(db_analysis)
-            db.commit()
-            db.refresh(db_analysis)
-            logger.info(f"Stored trend analysis in database with ID: {db_analysis.id}")
-            
-            # 7. Return response
-            return {
-                "success": True,
-                "category": category,
-                "videos": formatted_videos,
-                "analysis": trend_analysis,
-                "analysis_id": db_analysis.id
-            }
+            yield "done", {"success": True, "analysis_id": db_analysis.id}
             
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}", exc_info=True)
-            # Rollback transaction if an error occurred
-            db.rollback()
-            return {
+            logger.error(f"Error streaming query: {str(e)}", exc_info=True)
+            await db.rollback()
+            yield "done", {
                 "success": False,
                 "message": "An error occurred while processing your request",
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    async def _store_analysis(self, db, user_prompt, user_id, category, videos, formatted_videos, trend_analysis):
+        """
+        Persist a trend analysis
+        
+        Returns:
+            TrendAnalysis: The stored row (refreshed, so its ID is set)
+        """
+        db_analysis = TrendAnalysis(
+            user_id=user_id,
+            query=user_prompt,
+            platform="youtube",
+            trend_strength=float(trend_analysis.get('trend_strength', 5)),
+            trend_direction=trend_analysis.get('trend_direction', 'stable'),
+            summary=trend_analysis.get('summary', ''),
+            insights=trend_analysis.get('insights', ''),
+            recommendations=trend_analysis.get('recommendations', ''),
+            metrics=json.dumps({
+                "video_count": len(videos),
+                "avg_views": sum(v.view_count for v in videos) / len(videos) if videos else 0,
+                "avg_likes": sum(v.like_count for v in videos) / len(videos) if videos else 0,
+                "avg_comments": sum(v.comment_count for v in videos) / len(videos) if videos else 0
+            }),
+            full_response=json.dumps({
+                "category": category,
+                "videos": formatted_videos,
+                "analysis": trend_analysis
+            })
+        )
+        
+        db.add(db_analysis)
+        await db.commit()
+        await db.refresh(db_analysis)
+        logger.info(f"Stored trend analysis in database with ID: {db_analysis.id}")
+        return db_analysis
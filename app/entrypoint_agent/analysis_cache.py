@@ -0,0 +1,177 @@
+# app/entrypoint_agent/analysis_cache.py
+import asyncio
+import datetime
+import hashlib
+import json
+import math
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import engine as app_engine
+from app.models.analysis_cache_entry import AnalysisCacheEntry
+from app.services.youtube_service import normalize_query
+from app.utils.cache import TTLCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def bucket(value):
+    """Bucket a count on a half-octave log scale so small stat drift keeps the same key"""
+    return int(math.log2(value + 1) * 2)
+
+
+def analysis_key(category, videos, prompt_version, top_n=10):
+    """
+    Content address of a trend analysis.
+
+    Hashes the normalized category, the IDs of the top_n videos (sorted, so
+    rank shuffles don't matter), their bucketed stats and the prompt
+    template version.
+    """
+    snapshot = sorted(
+        (video.id, bucket(video.view_count), bucket(video.like_count), bucket(video.comment_count))
+        for video in videos[:top_n]
+    )
+    material = json.dumps([normalize_query(category), snapshot, prompt_version], separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class MemoryAnalysisBackend:
+    """In-process backend; entries are lost on restart"""
+
+    def __init__(self, maxsize, ttl):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl, name="analysis")
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, category, analysis, ttl):
+        self.cache.set(key, analysis, ttl=ttl)
+
+
+class DatabaseAnalysisBackend:
+    """
+    Persistent backend on the analysis_cache table.
+
+    Uses the application's MySQL engine by default, or a separate database
+    (e.g. sqlite:///./analysis_cache.db) when a URL is given. Timestamps are
+    naive UTC from this process. Expired rows are deleted when a lookup
+    finds one, and all of them at most every `sweep_interval` seconds on
+    write, so the table stays bounded by what was written within the TTL.
+    """
+
+    def __init__(self, database_url=None, sweep_interval=600):
+        engine = create_engine(database_url) if database_url else app_engine
+        if database_url:
+            AnalysisCacheEntry.__table__.create(bind=engine, checkfirst=True)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.sweep_interval = sweep_interval
+        self._last_sweep = None  # the first write sweeps rows left by earlier runs
+
+    def get(self, key):
+        db = self.SessionLocal()
+        try:
+            entry = db.get(AnalysisCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.expires_at <= datetime.datetime.utcnow():
+                db.delete(entry)
+                db.commit()
+                return None
+            return json.loads(entry.payload)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def set(self, key, category, analysis, ttl):
+        now = datetime.datetime.utcnow()
+        db = self.SessionLocal()
+        try:
+            db.merge(AnalysisCacheEntry(
+                key=key,
+                category=category[:255],
+                payload=json.dumps(analysis),
+                created_at=now,
+                expires_at=now + datetime.timedelta(seconds=ttl)
+            ))
+            db.commit()
+            if self._last_sweep is None or time.monotonic() - self._last_sweep >= self.sweep_interval:
+                self._last_sweep = None  # the first write sweeps rows left by earlier runs
+                self._sweep(db, now)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _sweep(self, db, now):
+        """Delete every expired row"""
+        deleted = (
+            db.query(AnalysisCacheEntry)
+            .filter(AnalysisCacheEntry.expires_at <= now)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        if deleted:
+            logger.debug("Deleted %d expired analysis cache rows", deleted)
+
+
+class AnalysisCache:
+    """
+    Content-addressed cache of LLM trend analyses.
+
+    Identical trend snapshots (see analysis_key) reuse a prior analysis
+    instead of re-prompting the model. Backend errors are logged and treated
+    as misses so the cache can never break the analyze path.
+    """
+
+    def __init__(self, backend=None, ttl=None):
+        self.ttl = ttl or settings.ANALYSIS_CACHE_TTL
+        if backend is None:
+            if settings.ANALYSIS_CACHE_BACKEND == "database":
+                backend = DatabaseAnalysisBackend(settings.ANALYSIS_CACHE_DATABASE_URL or None)
+            else:
+                backend = MemoryAnalysisBackend(settings.ANALYSIS_CACHE_MAX_ENTRIES, self.ttl)
+        self.backend = backend
+        self._blocking = isinstance(backend, DatabaseAnalysisBackend)
+        self.hits = 0
+        self.misses = 0
+
+    async def _call(self, func, *args):
+        if self._blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def get(self, key):
+        """Return the cached analysis for key, or None"""
+        try:
+            analysis = await self._call(self.backend.get, key)
+        except Exception as e:
+            logger.error(f"Analysis cache read failed: {str(e)}", exc_info=True)
+            analysis = None
+        if analysis is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return analysis
+
+    async def set(self, key, category, analysis):
+        """Store analysis under key"""
+        try:
+            await self._call(self.backend.set, key, category, analysis, self.ttl)
+        except Exception as e:
+            logger.error(f"Analysis cache write failed: {str(e)}", exc_info=True)
+
+    def stats(self):
+        """Return hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "name": "analysis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
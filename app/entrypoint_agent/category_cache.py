@@ -0,0 +1,255 @@
+# app/entrypoint_agent/category_cache.py
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Words that say how to search rather than what to search for; dropping them
+# lets "show me trending cooking videos" and "trending cooking" share an entry.
+# Words that can be part of a topic ("top gear", "hot sauce", "new girl")
+# are kept.
+FILLER_WORDS = frozenset({
+    "a", "about", "all", "an", "any", "are", "can", "find", "for", "get",
+    "give", "i", "in", "is", "latest", "me", "most", "my", "of", "on",
+    "please", "show", "some", "tell", "the", "this", "today", "trending",
+    "viral", "video", "videos", "want", "what", "whats", "which", "with",
+    "youtube",
+})
+
+
+def normalize_prompt(prompt):
+    """Lowercase, strip punctuation and filler words, and collapse whitespace"""
+    words = re.findall(r"[a-z0-9]+", str(prompt).lower())
+    topic = [word for word in words if word not in FILLER_WORDS]
+    # Keep the original words if the prompt was nothing but filler
+    return " ".join(topic or words)
+
+
+def _numbers(key):
+    """Digit runs in a normalized prompt ("ww2 1944" -> {"2", "1944"})"""
+    return frozenset(re.findall(r"[0-9]+", key))
+
+
+class NgramIndex:
+    """
+    Character n-gram TF-IDF index over short prompts.
+
+    Postings lists map each n-gram to the prompts containing it, so a lookup
+    only scores prompts that share at least one n-gram with the query.
+    Document frequencies are updated as entries come and go, and the least
+    recently matched entry is dropped once maxsize is reached.
+
+    Lookups run on the event loop, so IDF weights come from a snapshot that
+    is rebuilt once enough entries have been added or removed, and each
+    entry's vector norm is computed once per snapshot instead of on every
+    lookup. Only the max_candidates entries sharing the most n-grams with
+    the query are scored.
+    """
+
+    def __init__(self, maxsize=2048, n=3, max_candidates=256):
+        self.maxsize = maxsize
+        self.n = n
+        self.max_candidates = max_candidates
+        self._entries = OrderedDict()  # key -> (ngram counts, value, expires_at)
+        self._postings = defaultdict(set)
+        self._df = Counter()
+        self._idf_snapshot = {}
+        self._norms = {}  # key -> norm under the current snapshot
+        self._changes = 0  # adds/removes since the snapshot was taken
+
+    def _ngrams(self, text):
+        padded = f" {text} "
+        return Counter(padded[i:i + self.n] for i in range(max(1, len(padded) - self.n + 1)))
+
+    def _current_idf(self, gram):
+        # Smoothed idf, as in scikit-learn's TfidfVectorizer
+        return math.log((1 + len(self._entries)) / (1 + self._df.get(gram, 0))) + 1
+
+    def _idf(self, gram):
+        idf = self._idf_snapshot.get(gram)
+        if idf is None:
+            # Only n-grams first seen since the snapshot get here
+            idf = self._current_idf(gram)
+        return idf
+
+    def _refresh_idf(self):
+        """Take a new IDF snapshot once 5% of the entries (at least 16) have changed"""
+        if self._changes < max(16, len(self._entries) // 20) and self._idf_snapshot:
+            return
+        self._idf_snapshot = {gram: self._current_idf(gram) for gram in self._df}
+        self._norms.clear()
+        self._changes = 0
+
+    def _norm(self, grams):
+        return math.sqrt(sum((count * self._idf(gram)) ** 2 for gram, count in grams.items()))
+
+    def _entry_norm(self, key, grams):
+        norm = self._norms.get(key)
+        if norm is None:
+            norm = self._norms[key] = self._norm(grams)
+        return norm
+
+    def add(self, key, value, expires_at):
+        self.remove(key)
+        grams = self._ngrams(key)
+        self._entries[key] = (grams, value, expires_at)
+        self._changes += 1
+        for gram in grams:
+            self._postings[gram].add(key)
+            self._df[gram] += 1
+        while len(self._entries) > self.maxsize:
+            self.remove(next(iter(self._entries)))
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._norms.pop(key, None)
+        self._changes += 1
+        for gram in entry[0]:
+            self._postings[gram].discard(key)
+            if not self._postings[gram]:
+                del self._postings[gram]
+            self._df[gram] -= 1
+            if self._df[gram] <= 0:
+                del self._df[gram]
+
+    def search(self, key, accept=None):
+        """
+        Return (value, similarity) of the most similar live entry, or
+        (None, 0.0) when nothing shares an n-gram with key.
+
+        Args:
+            key (str): Normalized prompt to look up
+            accept (callable): Optional predicate on a candidate's key;
+                candidates it rejects are skipped
+        """
+        self._refresh_idf()
+        query = self._ngrams(key)
+        weights = {gram: count * self._idf(gram) ** 2 for gram, count in query.items()}
+        query_norm = self._norm(query)
+        if not query_norm:
+            return None, 0.0
+
+        # Only the entries sharing the most n-grams with the query can reach
+        # a useful similarity, so at most max_candidates are scored
+        shared = Counter()
+        for gram in query:
+            shared.update(self._postings.get(gram, ()))
+
+        now = time.monotonic()
+        expired = []
+        best_key, best_value, best_score = None, None, 0.0
+        for candidate, _ in shared.most_common(self.max_candidates):
+            grams, value, expires_at = self._entries[candidate]
+            if expires_at <= now:
+                expired.append(candidate)
+                continue
+            if accept is not None and not accept(candidate):
+                continue
+            dot = sum(weight * grams[gram] for gram, weight in weights.items() if gram in grams)
+            score = dot / (query_norm * self._entry_norm(candidate, grams))
+            if score > best_score:
+                best_key, best_value, best_score = candidate, value, score
+
+        for candidate in expired:
+            self.remove(candidate)
+        if best_key is not None:
+            self._entries.move_to_end(best_key)
+        return best_value, best_score
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CategoryCache:
+    """
+    Two-tier cache for LLM category extraction.
+
+    Tier one is an exact map from the normalized prompt to its category.
+    Tier two, when enabled, is a character n-gram TF-IDF index that returns
+    the category of the most similar cached prompt if the cosine similarity
+    is at least `threshold` and both prompts contain the same numbers, so
+    "nba highlights 2024" never reuses the category of "nba highlights 2023".
+    Both tiers are bounded and expire after `ttl`.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, similarity=None, threshold=None):
+        self.maxsize = maxsize or settings.CATEGORY_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.CATEGORY_CACHE_TTL
+        self.threshold = settings.CATEGORY_CACHE_SIMILARITY_THRESHOLD if threshold is None else threshold
+        use_similarity = settings.CATEGORY_CACHE_SIMILARITY if similarity is None else similarity
+
+        self.exact = TTLCache(maxsize=self.maxsize, ttl=self.ttl, name="category_exact")
+        self.index = NgramIndex(maxsize=self.maxsize) if use_similarity else None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def get(self, prompt):
+        """Return the cached category for prompt, or None on a miss"""
+        key = normalize_prompt(prompt)
+        category = self.exact.get(key)
+        if category is not None:
+            self.exact_hits += 1
+            return category
+        return self._similar(key, prompt)
+
+    async def get_async(self, prompt):
+        """
+        Same as get, but the similarity search runs on a worker thread so
+        it does not hold up the event loop (exact hits are answered inline)
+        """
+        key = normalize_prompt(prompt)
+        category = self.exact.get(key)
+        if category is not None:
+            self.exact_hits += 1
+            return category
+        if self.index is None:
+            self.misses += 1
+            return None
+        return await asyncio.to_thread(self._similar, key, prompt)
+
+    def _similar(self, key, prompt):
+        """Look key up in the similarity tier, counting the hit or miss"""
+        if self.index is not None:
+            with self._lock:
+                numbers = _numbers(key)
+                category, similarity = self.index.search(key, lambda candidate: _numbers(candidate) == numbers)
+            if category is not None and similarity >= self.threshold:
+                logger.debug("Category cache similarity hit (%.2f) for prompt: '%s'", similarity, prompt)
+                self.exact.set(key, category)
+                self.similar_hits += 1
+                return category
+
+        self.misses += 1
+        return None
+
+    def set(self, prompt, category):
+        """Cache the category extracted for prompt"""
+        key = normalize_prompt(prompt)
+        self.exact.set(key, category)
+        if self.index is not None:
+            with self._lock:
+                self.index.add(key, category, time.monotonic() + self.ttl)
+
+    def stats(self):
+        """Return per-tier hit counters and the overall hit ratio"""
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "name": "category",
+            "size": len(self.exact),
+            "index_size": len(self.index) if self.index is not None else 0,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0
+        }
@@ -1,32 +1,182 @@
 # app/entrypoint_agent/llm_handler.py
-import openai
+import asyncio
+import json
+import random
+import time
+from openai import AsyncOpenAI, RateLimitError
 from app.config import settings
+from app.entrypoint_agent.analysis_cache import AnalysisCache, analysis_key
+from app.entrypoint_agent.category_cache import CategoryCache
+from app.entrypoint_agent.prompts import TrendPromptBuilder
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from app.utils.profiler import record_span
 
 logger = get_logger(__name__)
 
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "llm_request_duration_seconds",
+    "OpenAI chat completion latency per attempt (whole stream for streamed calls)",
+    ("model", "outcome")
+)
+LLM_TOKENS_TOTAL = metrics.counter(
+    "llm_tokens_total",
+    "Tokens used by OpenAI chat completions",
+    ("model", "type")
+)
+
+# Bump whenever the analyze_trends prompt changes so cached analyses are not reused
+ANALYSIS_PROMPT_VERSION = "2"
+
 class LLMHandler:
-    def __init__(self):
+    def __init__(self, client=None):
         try:
             self.api_key = settings.OPENAI_API_KEY
-            openai.api_key = self.api_key
+            self.timeout = settings.OPENAI_TIMEOUT
+            self.max_retries = settings.OPENAI_MAX_RETRIES
+            self.retry_base_delay = settings.OPENAI_RETRY_BASE_DELAY
+            # Retries are handled in _complete so they can be jittered and
+            # release the concurrency slot while backing off.
+            # OPENAI_BASE_URL lets tests point the handler at a local fake server.
+            self.client = client or AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=settings.OPENAI_BASE_URL or None,
+                timeout=self.timeout,
+                max_retries=0
+            )
+            self.semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+            self.category_cache = CategoryCache()
+            self.analysis_cache = AnalysisCache()
+            self.prompt_builder = TrendPromptBuilder()
             logger.info("LLM handler initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize LLM handler: {str(e)}", exc_info=True)
             raise
     
-    def extract_category(self, user_prompt):
+    async def _complete(self, **kwargs):
+        """
+        Create a chat completion with a deadline, a cap on concurrent
+        completions, and jittered exponential backoff on rate limits.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    started = time.perf_counter()
+                    outcome = "error"
+                    response = None
+                    try:
+                        response = await asyncio.wait_for(
+                            self.client.chat.completions.create(**kwargs),
+                            timeout=self.timeout
+                        )
+                        outcome = "ok"
+                        return response
+                    except RateLimitError:
+                        outcome = "rate_limited"
+                        raise
+                    except asyncio.TimeoutError:
+                        outcome = "timeout"
+                        raise
+                    finally:
+                        self._record(kwargs.get('model'), started, outcome, getattr(response, "usage", None))
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                await self._backoff(e, attempt, kwargs.get('model'))
+    
+    async def _stream(self, **kwargs):
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+        
+        The concurrency slot is held for the whole stream and the deadline
+        covers the full response, not just the first chunk. Rate limits are
+        raised when the stream is created, so retrying never repeats tokens.
+        Token usage arrives in a final chunk without choices.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    loop = asyncio.get_running_loop()
+                    deadline = loop.time() + self.timeout
+                    started = time.perf_counter()
+                    outcome = "error"
+                    usage = None
+                    try:
+                        stream = await asyncio.wait_for(
+                            self.client.chat.completions.create(
+                                stream=True,
+                                stream_options={"include_usage": True},
+                                **kwargs
+                            ),
+                            timeout=self.timeout
+                        )
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(0, deadline - loop.time()))
+                            except StopAsyncIteration:
+                                outcome = "ok"
+                                return
+                            if getattr(chunk, "usage", None) is not None:
+                                usage = chunk.usage
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                yield chunk.choices[0].delta.content
+                    except RateLimitError:
+                        outcome = "rate_limited"
+                        raise
+                    except asyncio.TimeoutError:
+                        outcome = "timeout"
+                        raise
+                    except (GeneratorExit, asyncio.CancelledError):
+                        outcome = "cancelled"
+                        raise
+                    finally:
+                        self._record(kwargs.get('model'), started, outcome, usage)
+            except RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                await self._backoff(e, attempt, kwargs.get('model'))
+    
+    def _record(self, model, started, outcome, usage):
+        """Record the latency and token usage of one completion attempt"""
+        finished = time.perf_counter()
+        LLM_REQUEST_SECONDS.labels(model, outcome).observe(finished - started)
+        record_span("llm", f"{model} ({outcome})", started, finished)
+        if usage is not None:
+            LLM_TOKENS_TOTAL.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+            LLM_TOKENS_TOTAL.labels(model, "completion").inc(usage.completion_tokens or 0)
+    
+    async def _backoff(self, error, attempt, model):
+        """Sleep before retrying a rate-limited call (full jitter, honours Retry-After)"""
+        delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+        retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        logger.warning(
+            f"OpenAI rate limit for {model}, retrying in {delay:.2f}s "
+            f"(attempt {attempt + 1}/{self.max_retries})"
+        )
+        await asyncio.sleep(delay)
+    
+    async def extract_category(self, user_prompt):
         """
         Extract the main category from a user prompt
         """
         try:
+            category = await self.category_cache.get_async(user_prompt)
+            if category is not None:
+                logger.info(f"Using cached category '{category}' for prompt: '{user_prompt}'")
+                return category
+            
             prompt = f"""
             Given the user input: "{user_prompt}"
             Identify the main video category or topic the user is interested in.
             Output just the category name without any additional text.
             """
             
-            response = openai.ChatCompletion.create(
+            response = await self._complete(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "system", "content": "You are a helpful assistant."}, 
                          {"role": "user", "content": prompt}],
@@ -35,6 +185,7 @@ class LLMHandler:
             )
             
             category = response.choices[0].message.content.strip()
+            self.category_cache.set(user_prompt, category)
             logger.info(f"Extracted category '{category}' from prompt: '{user_prompt}'")
             return category
             
@@ -42,76 +193,98 @@ class LLMHandler:
             logger.error(f"Error extracting category: {str(e)}", exc_info=True)
             return user_prompt.lower().strip()
     
-    def analyze_trends(self, videos, category):
+    async def analyze_trends(self, videos, category):
         """
         Analyze trends in the videos using the LLM
         """
         try:
-            import json
-            
-            # Extract relevant data for analysis
-            video_data = []
-            for video in videos[:10]:
-                snippet = video.get('snippet', {})
-                stats = video.get('statistics', {})
-                
-                video_data.append({
-                    'title': snippet.get('title', ''),
-                    'channelTitle': snippet.get('channelTitle', ''),
-                    'publishedAt': snippet.get('publishedAt', ''),
-                    'views': int(stats.get('viewCount', 0)),
-                    'likes': int(stats.get('likeCount', 0)),
-                    'comments': int(stats.get('commentCount', 0))
-                })
-            
-            # Create prompt for trend analysis
-            prompt = f"""
-            Based on the following trending YouTube videos in the '{category}' category:
-            {json.dumps(video_data, indent=2)}
+            cache_key = analysis_key(category, videos, ANALYSIS_PROMPT_VERSION, self.prompt_builder.max_videos)
+            cached = await self.analysis_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Using cached trend analysis for '{category}'")
+                return cached
             
-            Please analyze and provide:
-            1. A trend strength score from 1-10
-            2. A trend direction (growing, stable, declining)
-            3. A summary of the overall trends (max 100 words)
-            4. Key insights about what makes these videos successful (max 200 words)
-            5. Recommendations for content creators in this space (max 200 words)
-            
-            Format your response as a JSON object with keys: trend_strength, trend_direction, summary, insights, recommendations
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo-16k",
-                messages=[{"role": "system", "content": "You are a helpful assistant skilled in analyzing YouTube trends."}, 
-                         {"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=1000
-            )
-            
-            analysis_text = response.choices[0].message.content.strip()
-            
-            # Try to parse as JSON, but handle text response as well
-            try:
-                analysis = json.loads(analysis_text)
-            except json.JSONDecodeError:
-                # If not valid JSON, extract what we can
-                logger.warning("LLM did not return valid JSON. Attempting to parse text.")
-                analysis = {
-                    "trend_strength": 5,
-                    "trend_direction": "stable",
-                    "summary": analysis_text[:100],
-                    "insights": analysis_text[100:300],
-                    "recommendations": analysis_text[300:500]
-                }
+            response = await self._complete(**self._trend_request(videos, category))
             
+            analysis = self._parse_analysis(response.choices[0].message.content.strip())
+            await self.analysis_cache.set(cache_key, category, analysis)
             logger.info(f"Generated trend analysis for '{category}'")
             return analysis
             
         except Exception as e:
             logger.error(f"Error analyzing trends: {str(e)}", exc_info=True)
+            return self._fallback_analysis(category)
+    
+    async def stream_trends(self, videos, category):
+        """
+        Streaming variant of analyze_trends.
+        
+        Yields ("token", text) for each piece of the LLM response as it
+        arrives, then a final ("analysis", dict) with the parsed analysis.
+        A cached analysis is yielded immediately without any tokens.
+        """
+        analysis = None
+        try:
+            cache_key = analysis_key(category, videos, ANALYSIS_PROMPT_VERSION, self.prompt_builder.max_videos)
+            analysis = await self.analysis_cache.get(cache_key)
+            if analysis is not None:
+                logger.info(f"Using cached trend analysis for '{category}'")
+            else:
+                parts = []
+                async for token in self._stream(**self._trend_request(videos, category)):
+                    parts.append(token)
+                    yield "token", token
+                
+                analysis = self._parse_analysis("".join(parts).strip())
+                await self.analysis_cache.set(cache_key, category, analysis)
+                logger.info(f"Generated streamed trend analysis for '{category}'")
+        except Exception as e:
+            logger.error(f"Error streaming trend analysis: {str(e)}", exc_info=True)
+            analysis = self._fallback_analysis(category)
+        
+        yield "analysis", analysis
+    
+    def _trend_request(self, videos, category):
+        """Build the chat completion arguments for a trend analysis"""
+        build = self.prompt_builder.build(videos, category)
+        logger.info(
+            f"Trend prompt for '{category}': {build.video_count} videos, ~{build.estimated_tokens} tokens "
+            f"({build.tokens_saved} saved vs JSON)"
+        )
+        
+        return {
+            "model": "gpt-3.5-turbo-16k",
+            "messages": [{"role": "system", "content": "You are a helpful assistant skilled in analyzing YouTube trends."}, 
+                         {"role": "user", "content": build.prompt}],
+            "temperature": 0.5,
+            "max_tokens": 1000
+        }
+    
+    def _parse_analysis(self, analysis_text):
+        """Parse the LLM response as JSON, but handle a text response as well"""
+        try:
+            return json.loads(analysis_text)
+        except json.JSONDecodeError:
+            # If not valid JSON, extract what we can
+            logger.warning("LLM did not return valid JSON. Attempting to parse text.")
             return {
                 "trend_strength": 5,
                 "trend_direction": "stable",
-                "summary": f"Analysis of trending videos in {category}.",
-                "insights": "Could not generate insights due to an error.",
-                "recommendations": "Try again later for recommendations."
-            }
\ No newline at end of file
+                "summary": analysis_text[:100],
+                "insights": analysis_text[100:300],
+                "recommendations": analysis_text[300:500]
+            }
+    
+    def is_fallback(self, analysis, category):
+        """True if analysis is the placeholder returned when the LLM call failed"""
+        return analysis == self._fallback_analysis(category)
+    
+    def _fallback_analysis(self, category):
+        """Analysis returned when the LLM call fails"""
+        return {
+            "trend_strength": 5,
+            "trend_direction": "stable",
+            "summary": f"Analysis of trending videos in {category}.",
+            "insights": "Could not generate insights due to an error.",
+            "recommendations": "Try again later for recommendations."
+        }
@@ -0,0 +1,144 @@
+# app/entrypoint_agent/prompts.py
+import json
+import math
+import re
+from app.config import settings
+
+TREND_ANALYSIS_TEMPLATE = """Trending YouTube videos in the '{category}' category, one per line:
+{table}
+
+Please analyze and provide:
+1. A trend strength score from 1-10
+2. A trend direction (growing, stable, declining)
+3. A summary of the overall trends (max 100 words)
+4. Key insights about what makes these videos successful (max 200 words)
+5. Recommendations for content creators in this space (max 200 words)
+
+Format your response as a JSON object with keys: trend_strength, trend_direction, summary, insights, recommendations"""
+
+TABLE_HEADER = "title|channel|published|views|likes|comments"
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]|\n\s*| {2,}")
+
+
+def estimate_tokens(text):
+    """
+    Estimate the token count of text without a tokenizer.
+
+    Words cost one token per started four characters; every punctuation mark,
+    line break (with its indentation) and run of spaces costs one. This
+    tracks BPE tokenizers closely enough for budgeting.
+    """
+    return sum(math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == "_" else 1
+               for piece in _TOKEN_PIECES.findall(text))
+
+
+def compact_number(value):
+    """Format a count compactly: 950, 12.3K, 4.5M, 1.2B"""
+    for divisor, suffix in ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K")):
+        if value >= divisor:
+            return f"{value / divisor:.1f}".rstrip("0").rstrip(".") + suffix
+    return str(value)
+
+
+def truncate_title(title, max_chars):
+    """
+    Shorten a title for the prompt.
+
+    Hashtags, bracketed tags like "(Official Video)" and repeated whitespace
+    are dropped first, unless that would leave nothing (e.g. "#shorts
+    #viral"); if the title is still too long it is cut at a word boundary
+    and marked with an ellipsis.
+    """
+    original = title
+    title = re.sub(r"#\w+", "", title)
+    title = re.sub(r"\s*[\[(][^\])]*[\])]", "", title)
+    title = " ".join(title.replace("|", "/").split())
+    if not title:
+        title = " ".join(original.replace("|", "/").split())
+    if len(title) <= max_chars:
+        return title
+    cut = title[:max_chars - 1].rsplit(" ", 1)[0] or title[:max_chars - 1]
+    return cut.rstrip(" ,.-:;") + "…"
+
+
+class PromptBuild:
+    """Result of building a prompt, with its token accounting"""
+
+    __slots__ = ("prompt", "video_count", "estimated_tokens", "baseline_tokens")
+
+    def __init__(self, prompt, video_count, estimated_tokens, baseline_tokens):
+        self.prompt = prompt
+        self.video_count = video_count
+        self.estimated_tokens = estimated_tokens
+        self.baseline_tokens = baseline_tokens
+
+    @property
+    def tokens_saved(self):
+        """Tokens saved compared to the indented-JSON prompt for the same videos"""
+        return self.baseline_tokens - self.estimated_tokens
+
+
+class TrendPromptBuilder:
+    """
+    Token-budgeted prompt builder for trend analysis.
+
+    Videos are packed as a pipe-separated table with compact numbers and
+    shortened titles instead of indented JSON. Rows are added in rank order
+    until max_videos or the token budget is reached, so more videos fit in
+    the same context without overshooting latency targets.
+    """
+
+    def __init__(self, token_budget=None, max_videos=None, max_title_chars=None):
+        self.token_budget = token_budget or settings.PROMPT_TOKEN_BUDGET
+        self.max_videos = max_videos or settings.PROMPT_MAX_VIDEOS
+        self.max_title_chars = max_title_chars or settings.PROMPT_MAX_TITLE_CHARS
+
+    def _row(self, video):
+        return "|".join((
+            truncate_title(video.title, self.max_title_chars),
+            truncate_title(video.channel_title, 30),
+            video.published_at[:10],
+            compact_number(video.view_count),
+            compact_number(video.like_count),
+            compact_number(video.comment_count),
+        ))
+
+    def build(self, videos, category):
+        """
+        Build the trend analysis prompt for the top videos.
+
+        Returns:
+            PromptBuild: The prompt and its estimated/baseline token counts
+        """
+        overhead = estimate_tokens(TREND_ANALYSIS_TEMPLATE.format(category=category, table=TABLE_HEADER))
+        used = overhead
+        rows = [TABLE_HEADER]
+        for video in videos[:self.max_videos]:
+            row = self._row(video)
+            cost = estimate_tokens(row) + 1
+            if used + cost > self.token_budget and len(rows) > 1:
+                break
+            rows.append(row)
+            used += cost
+
+        included = videos[:len(rows) - 1]
+        prompt = TREND_ANALYSIS_TEMPLATE.format(category=category, table="\n".join(rows))
+        return PromptBuild(
+            prompt=prompt,
+            video_count=len(included),
+            estimated_tokens=estimate_tokens(prompt),
+            baseline_tokens=self._baseline_tokens(included, category)
+        )
+
+    def _baseline_tokens(self, videos, category):
+        """Estimated tokens of the previous indented-JSON prompt for the same videos"""
+        video_data = [{
+            'title': video.title,
+            'channelTitle': video.channel_title,
+            'publishedAt': video.published_at,
+            'views': video.view_count,
+            'likes': video.like_count,
+            'comments': video.comment_count
+        } for video in videos]
+        return estimate_tokens(TREND_ANALYSIS_TEMPLATE.format(category=category, table=json.dumps(video_data, indent=2)))
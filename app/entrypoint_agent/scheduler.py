@@ -0,0 +1,148 @@
+# app/entrypoint_agent/scheduler.py
+import asyncio
+import datetime
+import time
+from collections import Counter, deque
+from sqlalchemy import func
+from app.config import settings
+from app.database import SessionLocal
+from app.entrypoint_agent.category_cache import normalize_prompt
+from app.models.trend_analysis import TrendAnalysis
+from app.services.youtube_service import SEARCH_UNIT_COST, VIDEOS_LIST_UNIT_COST
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Worst-case cost of refreshing one prompt (AsyncYouTubeService._fetch_trending
+# with at most 50 results): the exact and broader-term searches, the
+# mostPopular chart (started alongside them in speculative mode) and the
+# videos.list call for the details. No LLM call is made.
+REFRESH_UNIT_COST = 2 * SEARCH_UNIT_COST + 2 * VIDEOS_LIST_UNIT_COST
+
+
+class TrendPrecomputeScheduler:
+    """
+    Refreshes the responses for the most requested prompts ahead of demand.
+
+    Every `interval` seconds the most frequent prompts in the trend_analyses
+    history (over the last `lookback_hours`) are passed to `precompute`, an
+    async callable that refreshes the cached response for a prompt (see
+    trending.precompute_analyze_results), so requests for hot prompts are
+    served from memory. Each refresh is charged its worst-case unit cost;
+    refreshes stop for the cycle once the rolling 24 hour unit budget would
+    be exceeded, or while the shared YouTube quota is running low. The
+    budget is tracked per worker process.
+    """
+
+    def __init__(self, precompute, quota=None, interval=None, top_n=None, lookback_hours=None,
+                 daily_unit_budget=None):
+        self.precompute = precompute
+        self.quota = quota
+        self.interval = interval or settings.PRECOMPUTE_INTERVAL
+        self.top_n = top_n or settings.PRECOMPUTE_TOP_N
+        self.lookback_hours = lookback_hours or settings.PRECOMPUTE_LOOKBACK_HOURS
+        self.daily_unit_budget = daily_unit_budget or settings.PRECOMPUTE_DAILY_UNIT_BUDGET
+        self._spend = deque()  # (timestamp, units)
+        self._task = None
+        self.hot_prompts = []
+        self.refreshes = 0
+        self.skipped = 0
+
+    def start(self):
+        """Start the refresh loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+            logger.info(f"Trend precompute scheduler started (every {self.interval}s, top {self.top_n})")
+
+    async def stop(self):
+        """Cancel the refresh loop and wait for it to finish"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Trend precompute scheduler stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Trend precompute cycle failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self):
+        """Run one refresh cycle over the current hot prompts"""
+        self.hot_prompts = await asyncio.to_thread(self._load_hot_prompts)
+        refreshed = 0
+        for prompt in self.hot_prompts:
+            if self.quota is not None and self.quota.is_low():
+                remaining = len(self.hot_prompts) - self.hot_prompts.index(prompt)
+                self.skipped += remaining
+                logger.warning(f"YouTube quota low, skipping {remaining} hot prompts this cycle")
+                break
+            if not self._reserve():
+                remaining = len(self.hot_prompts) - self.hot_prompts.index(prompt)
+                self.skipped += remaining
+                logger.warning(f"Precompute budget exhausted, skipping {remaining} hot prompts this cycle")
+                break
+            try:
+                if await self.precompute(prompt):
+                    refreshed += 1
+            except Exception as e:
+                logger.error(f"Error precomputing trends for '{prompt}': {str(e)}", exc_info=True)
+        self.refreshes += refreshed
+        logger.info(f"Precomputed trends for {refreshed} of {len(self.hot_prompts)} hot prompts")
+
+    def _load_hot_prompts(self):
+        """Most requested prompts in the lookback window, merged by normalized form"""
+        # timestamp defaults to the database NOW(), i.e. server local time
+        since = datetime.datetime.now() - datetime.timedelta(hours=self.lookback_hours)
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(TrendAnalysis.query, func.count(TrendAnalysis.id))
+                .filter(TrendAnalysis.timestamp >= since)
+                .group_by(TrendAnalysis.query)
+                .order_by(func.count(TrendAnalysis.id).desc())
+                .limit(self.top_n * 5)
+                .all()
+            )
+        finally:
+            db.close()
+
+        counts = Counter()
+        representative = {}
+        for query, count in rows:
+            if not query:
+                continue
+            key = normalize_prompt(query)
+            counts[key] += count
+            representative.setdefault(key, query)
+        return [representative[key] for key, _ in counts.most_common(self.top_n)]
+
+    def _reserve(self):
+        """Reserve the cost of one refresh if the rolling 24 hour budget allows it"""
+        now = time.monotonic()
+        while self._spend and self._spend[0][0] <= now - 86400:
+            self._spend.popleft()
+        units = sum(entry[1] for entry in self._spend)
+        if units + REFRESH_UNIT_COST > self.daily_unit_budget:
+            return False
+        self._spend.append((now, REFRESH_UNIT_COST))
+        return True
+
+    def stats(self):
+        """Return refresh counters and remaining budget"""
+        now = time.monotonic()
+        recent = [entry for entry in self._spend if entry[0] > now - 86400]
+        return {
+            "hot_prompts": len(self.hot_prompts),
+            "refreshes": self.refreshes,
+            "skipped": self.skipped,
+            "units_remaining": self.daily_unit_budget - sum(entry[1] for entry in recent)
+        }
@@ -2,18 +2,24 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-import time
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import traceback
 import os
 
-from app.database import get_db, engine, Base
-from app.utils.security import get_current_user
-from app.utils.logger import get_logger
+from app.database import get_async_db, engine, Base, pool_stats
+from app.utils.security import get_current_user_async, get_admin_user, password_pool
+from app.utils.logger import get_logger, shutdown_logging, logging_stats
+from app.utils.metrics import metrics, cache_families
+from app.utils.middleware import InstrumentationMiddleware
+from app.utils.profiler import RequestProfiler
+from app.utils.user_cache import user_cache
 from app.config import settings
 from app.api import auth, trending  # Import both routers correctly
+from app.entrypoint_agent.scheduler import TrendPrecomputeScheduler
+from app.models.user import User
 
 # Get logger for this module
 logger = get_logger(__name__)
@@ -44,32 +50,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-        logger.debug(f"Request processed in {process_time:.4f} seconds: {request.method} {request.url.path}")
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        logger.error(f"Request failed in {process_time:.4f} seconds: {request.method} {request.url.path}")
-        logger.error(f"Error: {str(e)}", exc_info=True)
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={"detail": "Internal server error"}
-        )
+# Slow request profiles (off unless PROFILE_ENABLED is set)
+request_profiler = RequestProfiler()
 
-# Add request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"Request received: {request.method} {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"Response sent: {response.status_code}")
-    return response
+# Request timing, access logging, error handling and slow request
+# profiling in a single ASGI layer
+app.add_middleware(InstrumentationMiddleware, profiler=request_profiler)
 
 # Mount static files - FIXED VERSION
 try:
@@ -95,9 +81,49 @@ logger.info("Auth and Trending routers included")
 templates = Jinja2Templates(directory="templates")
 logger.info("Template engine initialized")
 
+# Refreshes the /analyze results of hot prompts in the background
+precompute_scheduler = TrendPrecomputeScheduler(
+    trending.precompute_analyze_results,
+    quota=trending.youtube_service.service.quota
+)
+
+def collect_component_metrics():
+    """Gauges and counters read from the components' own stats() at scrape time"""
+    youtube = trending.youtube_service.service
+    caches = [
+        youtube.cache.stats(),
+        youtube.video_cache.stats(),
+        youtube.stale_cache.stats(),
+        trending.llm_handler.category_cache.stats(),
+        trending.llm_handler.analysis_cache.stats(),
+        trending.trending_agent.results.stats(),
+        trending.analyze_results.stats(),
+        user_cache.stats()
+    ]
+    pools = pool_stats()
+    hashing = password_pool.stats()
+    return cache_families(caches) + [
+        ("db_pool_checked_out", "gauge", "Connections currently checked out",
+         [({"pool": name}, stats.get("checked_out", 0)) for name, stats in pools.items()]),
+        ("db_pool_overflow", "gauge", "Connections open beyond pool_size",
+         [({"pool": name}, stats.get("overflow", 0)) for name, stats in pools.items()]),
+        ("db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a connection",
+         [({"pool": name}, stats["timeouts"]) for name, stats in pools.items()]),
+        ("password_hash_queue_depth", "gauge", "bcrypt operations running or waiting",
+         [({}, hashing["depth"])]),
+        ("password_hash_rejected_total", "counter", "bcrypt operations turned away because the queue was full",
+         [({}, hashing["rejected"])]),
+        ("youtube_quota_remaining_units", "gauge", "YouTube Data API units left in the rolling window",
+         [({}, youtube.quota.remaining())]),
+        ("log_records_dropped_total", "counter", "Log records dropped because the log queue was full",
+         [({"logger": name}, stats["dropped"]) for name, stats in logging_stats().items()])
+    ]
+
+metrics.register_collector(collect_component_metrics)
+
 # Root route - redirect to login if not authenticated
 @app.get("/")
-async def root(request: Request, db: Session = Depends(get_db)):
+async def root(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         logger.debug("Serving index page")
         return templates.TemplateResponse("index.html", {"request": request})
@@ -110,9 +136,9 @@ async def root(request: Request, db: Session = Depends(get_db)):
 
 # Dashboard route - requires authentication
 @app.get("/dashboard")
-async def dashboard(request: Request, db: Session = Depends(get_db)):
+async def dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        current_user = await get_current_user(request, db)
+        current_user = await get_current_user_async(request, db)
         logger.info(f"User {current_user.username} accessed dashboard")
         return templates.TemplateResponse("dashboard.html", {"request": request, "user": current_user})
     except HTTPException:
@@ -127,11 +153,11 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
     
 # Trending page route
 @app.get("/trending")
-async def trending_page(request: Request, db: Session = Depends(get_db)):
+async def trending_page(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         # Check if user is logged in, but make this optional
         try:
-            current_user = await get_current_user(request, db)
+            current_user = await get_current_user_async(request, db)
             logger.info(f"User {current_user.username} accessed trending page")
             return templates.TemplateResponse("trending.html", {"request": request, "user": current_user})
         except HTTPException:
@@ -145,6 +171,37 @@ async def trending_page(request: Request, db: Session = Depends(get_db)):
             content={"detail": "Internal server error"}
         )
 
+# Connection pool metrics, for sizing DB_POOL_SIZE / DB_MAX_OVERFLOW
+@app.get("/health/db")
+async def db_pool_health():
+    return pool_stats()
+
+# bcrypt pool queue depth and timings
+@app.get("/health/auth")
+async def password_pool_health():
+    return password_pool.stats()
+
+# Prometheus text exposition of the in-process metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Saved slow request profiles, newest first
+@app.get("/admin/profiles")
+async def list_profiles(admin: User = Depends(get_admin_user)):
+    return {
+        "enabled": request_profiler.enabled,
+        "threshold_ms": request_profiler.threshold_ms,
+        "profiles": await asyncio.to_thread(request_profiler.list_profiles)
+    }
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, admin: User = Depends(get_admin_user)):
+    profile = await asyncio.to_thread(request_profiler.get_profile, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile
+
 # Error handler for 401 Unauthorized
 @app.exception_handler(status.HTTP_401_UNAUTHORIZED)
 async def unauthorized_exception_handler(request, exc):
@@ -164,13 +221,19 @@ async def internal_exception_handler(request, exc):
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application starting up")
-    # You can add initialization code here, like connecting to external services
+    if settings.PRECOMPUTE_ENABLED:
+        precompute_scheduler.start()
+    request_profiler.start()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutting down")
-    # You can add cleanup code here, like closing connections
+    await precompute_scheduler.stop()
+    request_profiler.stop()
+    trending.youtube_service.shutdown()
+    password_pool.shutdown()
+    shutdown_logging()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,17 @@
+# app/models/analysis_cache_entry.py
+import datetime
+from sqlalchemy import Column, String, DateTime, Text
+from app.database import Base
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+    
+    key = Column(String(64), primary_key=True)
+    category = Column(String(255), index=True)
+    payload = Column(Text)
+    # Naive UTC from the application clock, like expires_at
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+    
+    def __repr__(self):
+        return f"<AnalysisCacheEntry(key='{self.key}', category='{self.category}')>"
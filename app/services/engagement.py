@@ -0,0 +1,100 @@
+# app/services/engagement.py
+import datetime
+import numpy as np
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_MICROSECONDS_PER_DAY = 86400 * 1000000
+
+
+class EngagementScorer:
+    """
+    Columnar engagement scoring.
+
+    Views, likes, comments and publish timestamps are gathered into NumPy
+    arrays and scored in a single vectorized pass:
+
+        score = views * w_views + likes * w_likes + comments * w_comments
+                + recency * w_recency
+
+    where recency = max(0, 1 - days_since_published / recency_window_days)
+    and days_since_published is the whole number of days (floored, as with
+    timedelta.days). With the default weights this reproduces the original
+    per-video formula exactly, including the stable order of equal scores.
+    """
+
+    def __init__(self, view_weight=None, like_weight=None, comment_weight=None,
+                 recency_weight=None, recency_window_days=None):
+        self.view_weight = settings.ENGAGEMENT_VIEW_WEIGHT if view_weight is None else view_weight
+        self.like_weight = settings.ENGAGEMENT_LIKE_WEIGHT if like_weight is None else like_weight
+        self.comment_weight = settings.ENGAGEMENT_COMMENT_WEIGHT if comment_weight is None else comment_weight
+        self.recency_weight = settings.ENGAGEMENT_RECENCY_WEIGHT if recency_weight is None else recency_weight
+        self.recency_window_days = (
+            settings.ENGAGEMENT_RECENCY_WINDOW_DAYS if recency_window_days is None else recency_window_days
+        )
+
+    def columns(self, videos):
+        """
+        Extract the scoring columns from VideoRecords.
+
+        Returns:
+            tuple: (views, likes, comments, published) arrays; published is
+            datetime64[us] in UTC with NaT where the publish time is unknown
+        """
+        n = len(videos)
+        views = np.fromiter((v.view_count for v in videos), dtype=np.float64, count=n)
+        likes = np.fromiter((v.like_count for v in videos), dtype=np.float64, count=n)
+        comments = np.fromiter((v.comment_count for v in videos), dtype=np.float64, count=n)
+        published = np.array([v.published_us for v in videos], dtype='datetime64[us]')
+        return views, likes, comments, published
+
+    def score(self, views, likes, comments, published, now=None):
+        """
+        Score videos from their columns.
+
+        Returns:
+            tuple: (scores, recency) float64 arrays
+        """
+        if now is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+        now = np.datetime64(now.astimezone(datetime.timezone.utc).replace(tzinfo=None), 'us')
+
+        missing = np.isnat(published)
+        age_us = (now - np.where(missing, now, published)).astype(np.int64)
+        days_since_published = np.floor_divide(age_us, _MICROSECONDS_PER_DAY)
+        recency = np.maximum(0, 1 - (days_since_published / self.recency_window_days))
+        recency[missing] = 0
+
+        scores = (
+            views * self.view_weight +
+            likes * self.like_weight +
+            comments * self.comment_weight +
+            recency * self.recency_weight
+        )
+        return scores, recency
+
+    def rank(self, scores, top_k=None):
+        """
+        Order indices by descending score, ties kept in input order.
+
+        When top_k is smaller than the number of videos, argpartition selects
+        the candidates first so only those need a full sort.
+
+        Returns:
+            numpy.ndarray: Indices of the top_k (or all) videos, best first
+        """
+        n = len(scores)
+        if top_k is None or top_k >= n:
+            candidates = np.arange(n)
+        elif top_k <= 0:
+            return np.arange(0)
+        else:
+            kth = np.argpartition(-scores, top_k - 1)[top_k - 1]
+            # Keep every video tied with the k-th score so ties resolve by input order
+            candidates = np.flatnonzero(scores >= scores[kth])
+
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order][:top_k]
+
@@ -0,0 +1,134 @@
+# app/services/quota.py
+import datetime
+import threading
+import time
+from collections import Counter, deque
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# YouTube Data API quota cost per call type
+UNIT_COSTS = {
+    "search.list": 100,
+    "videos.list": 1,
+}
+
+
+try:
+    # YouTube resets daily quotas at midnight Pacific time
+    _QUOTA_RESET_TZ = ZoneInfo("America/Los_Angeles")
+except ZoneInfoNotFoundError:
+    _QUOTA_RESET_TZ = datetime.timezone(datetime.timedelta(hours=-8), "PST")
+
+
+def seconds_until_quota_reset(now=None):
+    """Seconds until the next midnight Pacific time (now is an aware datetime)"""
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(_QUOTA_RESET_TZ)
+    reset = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=_QUOTA_RESET_TZ)
+    # Subtract in UTC, so a DST change before midnight is accounted for
+    return (reset.astimezone(datetime.timezone.utc) - now.astimezone(datetime.timezone.utc)).total_seconds()
+
+
+class QuotaExceededError(Exception):
+    """Raised when a YouTube call cannot be afforded within the quota budget"""
+
+
+class QuotaBudget:
+    """
+    Rolling-window accounting of YouTube Data API quota units.
+
+    Every call is charged its unit cost before it is made and the spend is
+    kept for `window` seconds. Once less than `low_watermark` of the daily
+    units remain the budget reports itself as low, so callers can prefer
+    cached or stale results over spending what is left. A quotaExceeded
+    error from the API marks the budget exhausted until the oldest recorded
+    spend leaves the window, or until the API resets the quota at midnight
+    Pacific time if that comes first.
+
+    The budget is tracked per process: with several workers each one
+    assumes `daily_units` for itself, so YOUTUBE_DAILY_QUOTA should be the
+    project quota divided by the worker count.
+    """
+
+    def __init__(self, daily_units=None, window=None, low_watermark=None):
+        self.daily_units = daily_units or settings.YOUTUBE_DAILY_QUOTA
+        self.window = window or settings.YOUTUBE_QUOTA_WINDOW
+        self.low_watermark = settings.YOUTUBE_QUOTA_LOW_WATERMARK if low_watermark is None else low_watermark
+        self._spend = deque()  # (timestamp, call_type, units)
+        self._used = 0
+        self._lock = threading.Lock()
+        self._exhausted_until = 0.0
+        self.calls = Counter()
+        self.units = Counter()
+        self.denied = Counter()
+
+    def _expire(self, now):
+        while self._spend and self._spend[0][0] <= now - self.window:
+            self._used -= self._spend.popleft()[2]
+
+    def remaining(self):
+        """Units left in the current window"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if now < self._exhausted_until:
+                return 0
+            return max(0, self.daily_units - self._used)
+
+    def is_low(self):
+        """True once the remaining units drop below the low watermark"""
+        return self.remaining() < self.daily_units * self.low_watermark
+
+    def can_afford(self, call_type, calls=1):
+        """True if `calls` calls of call_type fit in the remaining units"""
+        return UNIT_COSTS[call_type] * calls <= self.remaining()
+
+    def charge(self, call_type):
+        """
+        Record one call of call_type against the budget.
+
+        Raises:
+            QuotaExceededError: If the call does not fit in the remaining units
+        """
+        units = UNIT_COSTS[call_type]
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if now < self._exhausted_until or self._used + units > self.daily_units:
+                self.denied[call_type] += 1
+                raise QuotaExceededError(
+                    f"YouTube quota budget exhausted ({self._used}/{self.daily_units} units used), "
+                    f"cannot afford {call_type}"
+                )
+            self._spend.append((now, call_type, units))
+            self._used += units
+            self.calls[call_type] += 1
+            self.units[call_type] += units
+
+    def mark_exhausted(self):
+        """
+        Stop spending until the window rolls over or the quota resets,
+        whichever comes first (the API reported quotaExceeded)
+        """
+        now = time.monotonic()
+        reset = now + seconds_until_quota_reset()
+        with self._lock:
+            oldest = self._spend[0][0] if self._spend else now
+            self._exhausted_until = min(oldest + self.window, reset)
+        logger.warning(f"YouTube API reported quota exceeded, pausing calls for {self._exhausted_until - now:.0f}s")
+
+    def stats(self):
+        """Return units used/remaining and per call type counters"""
+        remaining = self.remaining()
+        return {
+            "daily_units": self.daily_units,
+            "window_seconds": self.window,
+            "used": self.daily_units - remaining,
+            "remaining": remaining,
+            "low": remaining < self.daily_units * self.low_watermark,
+            "calls": dict(self.calls),
+            "units": dict(self.units),
+            "denied": dict(self.denied)
+        }
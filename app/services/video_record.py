@@ -0,0 +1,101 @@
+# app/services/video_record.py
+import datetime
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class VideoRecord:
+    """
+    Compact representation of a YouTube video.
+
+    Built once from the videos.list API item when it is ingested, keeping
+    only the fields the app uses with the statistics already parsed to ints
+    and the publish time parsed to microseconds since the epoch. Records are
+    shared between cache entries and requests, so they are treated as
+    immutable; ranking attaches scores with `with_engagement`, which returns
+    a copy.
+    """
+
+    __slots__ = (
+        "id",
+        "title",
+        "channel_title",
+        "published_at",
+        "published_us",
+        "thumbnail",
+        "view_count",
+        "like_count",
+        "comment_count",
+        "engagement_score",
+        "recency_score",
+    )
+
+    def __init__(self, id, title="", channel_title="", published_at="", published_us=None,
+                 thumbnail="", view_count=0, like_count=0, comment_count=0,
+                 engagement_score=0.0, recency_score=0.0):
+        self.id = id
+        self.title = title
+        self.channel_title = channel_title
+        self.published_at = published_at
+        self.published_us = published_us
+        self.thumbnail = thumbnail
+        self.view_count = view_count
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.engagement_score = engagement_score
+        self.recency_score = recency_score
+
+    @classmethod
+    def from_api(cls, item):
+        """Build a record from a videos.list item"""
+        snippet = item.get('snippet', {})
+        stats = item.get('statistics', {})
+        published_at = snippet.get('publishedAt', '')
+
+        return cls(
+            id=item.get('id'),
+            title=snippet.get('title', ''),
+            channel_title=snippet.get('channelTitle', ''),
+            published_at=published_at,
+            published_us=parse_published_at(published_at),
+            thumbnail=snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+            view_count=int(stats.get('viewCount', 0)),
+            like_count=int(stats.get('likeCount', 0)),
+            comment_count=int(stats.get('commentCount', 0))
+        )
+
+    def with_engagement(self, score, recency_score):
+        """Return a copy of this record carrying the given engagement scores"""
+        record = VideoRecord.__new__(VideoRecord)
+        for slot in VideoRecord.__slots__:
+            setattr(record, slot, getattr(self, slot))
+        record.engagement_score = score
+        record.recency_score = recency_score
+        return record
+
+    def to_dict(self):
+        """Format the record for the frontend"""
+        return {
+            "id": self.id,
+            "title": self.title or 'Untitled',
+            "channelTitle": self.channel_title or 'Unknown Channel',
+            "publishedAt": self.published_at,
+            "thumbnail": self.thumbnail,
+            "viewCount": self.view_count,
+            "likeCount": self.like_count,
+            "commentCount": self.comment_count,
+            "engagementScore": self.engagement_score
+        }
+
+    def __repr__(self):
+        return f"<VideoRecord(id='{self.id}', title='{self.title}')>"
+
+
+def parse_published_at(published_at):
+    """Convert an ISO 8601 publishedAt value to microseconds since the epoch (None if empty)"""
+    if not published_at:
+        return None
+    published_date = datetime.datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+    if published_date.tzinfo is None:
+        published_date = published_date.replace(tzinfo=datetime.timezone.utc)
+    return (published_date - _EPOCH) // datetime.timedelta(microseconds=1)
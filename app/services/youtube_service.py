@@ -1,93 +1,432 @@
 # app/services/youtube_service.py (Updated)
 import googleapiclient.discovery
 import googleapiclient.errors
-import datetime
+import httplib2
+import asyncio
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
+from app.services.engagement import EngagementScorer
+from app.services.quota import QuotaBudget, QuotaExceededError, UNIT_COSTS
+from app.services.video_record import VideoRecord
+from app.utils.cache import TTLCache
+from app.utils.singleflight import SingleFlight
 from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from app.utils.profiler import record_span
 
 logger = get_logger(__name__)
 
+YOUTUBE_REQUEST_SECONDS = metrics.histogram(
+    "youtube_request_duration_seconds",
+    "YouTube Data API call latency",
+    ("endpoint", "outcome")
+)
+
+# YouTube Data API quota cost per call type
+SEARCH_UNIT_COST = UNIT_COSTS["search.list"]
+VIDEOS_LIST_UNIT_COST = UNIT_COSTS["videos.list"]
+
+# Largest page size for search.list and largest id batch for videos.list
+MAX_PAGE_SIZE = 50
+
+def normalize_query(query):
+    """Normalize a search term so trivially different spellings share a cache entry"""
+    return " ".join(str(query).lower().split())
+
+def chunked(items, size):
+    """Split items into consecutive lists of at most size elements"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 class YouTubeService:
-    def __init__(self):
+    def __init__(self, cache=None, video_cache=None, quota=None):
         try:
             self.api_key = settings.YOUTUBE_API_KEY
-            self.youtube = googleapiclient.discovery.build(
-                "youtube", "v3", developerKey=self.api_key
+            self.timeout = settings.YOUTUBE_REQUEST_TIMEOUT
+            self.region = settings.YOUTUBE_REGION
+            self.language = settings.YOUTUBE_LANGUAGE
+            self.scorer = EngagementScorer()
+            # Any object with get(key)/set(key, value) can be plugged in here
+            self.cache = cache if cache is not None else TTLCache(
+                maxsize=settings.YOUTUBE_CACHE_MAX_ENTRIES,
+                ttl=settings.YOUTUBE_CACHE_TTL,
+                name="youtube"
+            )
+            # Per-video detail cache shared by every search that returns the video
+            self.video_cache = video_cache if video_cache is not None else TTLCache(
+                maxsize=settings.YOUTUBE_VIDEO_CACHE_MAX_ENTRIES,
+                ttl=settings.YOUTUBE_VIDEO_CACHE_TTL,
+                name="youtube_videos"
             )
+            # Every call is charged against the daily unit quota
+            self.quota = quota if quota is not None else QuotaBudget()
+            # Last known results, kept long after the caches above expire so
+            # they can be served when the quota runs low
+            self.stale_cache = TTLCache(
+                maxsize=settings.YOUTUBE_STALE_MAX_ENTRIES,
+                ttl=settings.YOUTUBE_STALE_TTL,
+                name="youtube_stale"
+            )
+            # httplib2 connections are not thread-safe, so every thread that
+            # talks to the API gets its own client (see the `youtube` property)
+            self._local = threading.local()
+            self.youtube
             logger.info("YouTube API client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize YouTube API client: {str(e)}", exc_info=True)
             raise
     
-    def get_trending_videos(self, category, max_results=10):
+    @property
+    def youtube(self):
+        """Return the API client bound to the calling thread, building it on first use"""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = googleapiclient.discovery.build(
+                "youtube", "v3",
+                developerKey=self.api_key,
+                http=httplib2.Http(timeout=self.timeout)
+            )
+            self._local.client = client
+        return client
+    
+    def _execute(self, request, call_type):
         """
-        Fetch trending videos from YouTube based on category.
+        Charge call_type against the quota budget and execute the request.
+        
+        Raises:
+            QuotaExceededError: If the budget cannot afford the call
+        """
+        self.quota.charge(call_type)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = request.execute()
+            outcome = "ok"
+            return response
+        except googleapiclient.errors.HttpError as e:
+            if e.resp.status == 403 and "quotaExceeded" in str(e.content):
+                self.quota.mark_exhausted()
+                outcome = "quota_exceeded"
+            raise
+        finally:
+            finished = time.perf_counter()
+            YOUTUBE_REQUEST_SECONDS.labels(call_type, outcome).observe(finished - started)
+            record_span("youtube", call_type, started, finished)
+    
+    def _stale(self, key, what):
+        """Return the last known result for key, logging that it is served stale"""
+        stale = self.stale_cache.get(key)
+        if stale is not None:
+            logger.info(f"YouTube quota low ({self.quota.remaining()} units left), serving stale {what}")
+        return stale
+    
+    def search_video_ids(self, query, max_results=10):
+        """
+        Search for videos matching query, ordered by view count.
+        
+        Follows nextPageToken until max_results IDs are collected, so the
+        candidate pool can be larger than a single 50-result page.
+        
+        Returns:
+            list: Video IDs (served from the cache when possible)
+        """
+        key = ("search", normalize_query(query), "viewCount", self.language, max_results)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Search cache hit for '%s'", query)
+            return list(cached)
+        
+        # Searches are the expensive call, so prefer stale results when
+        # the quota is running low
+        if self.quota.is_low() or not self.quota.can_afford("search.list"):
+            stale = self._stale(key, f"search results for '{query}'")
+            if stale is not None:
+                return list(stale)
+            if not self.quota.can_afford("search.list"):
+                logger.warning(f"YouTube quota exhausted, skipping search for '{query}'")
+                return []
+        
+        video_ids = []
+        page_token = None
+        while len(video_ids) < max_results:
+            if video_ids and not self.quota.can_afford("search.list"):
+                logger.warning(f"YouTube quota exhausted, stopping search for '{query}' at {len(video_ids)} results")
+                break
+            search_response = self._execute(self.youtube.search().list(
+                q=query,
+                part="id",
+                maxResults=min(MAX_PAGE_SIZE, max_results - len(video_ids)),
+                type="video",
+                order="viewCount",  # Sort by view count
+                relevanceLanguage=self.language,
+                pageToken=page_token
+            ), "search.list")
+            
+            video_ids.extend(item['id']['videoId'] for item in search_response.get('items', []))
+            page_token = search_response.get('nextPageToken')
+            if not page_token:
+                break
+        
+        video_ids = list(dict.fromkeys(video_ids))[:max_results]
+        self.cache.set(key, tuple(video_ids))
+        self.stale_cache.set(key, tuple(video_ids))
+        return video_ids
+    
+    def get_video_details(self, video_ids):
+        """
+        Fetch snippet, statistics and content details for the given video IDs.
+        
+        IDs already in the per-video cache are not requested again; the rest
+        are fetched in chunks of 50 (the videos.list limit).
+        
+        Returns:
+            list: VideoRecords in the order of video_ids
+        """
+        details = {}
+        missing = []
+        for video_id in dict.fromkeys(video_ids):
+            cached = self.video_cache.get(video_id)
+            if cached is not None:
+                details[video_id] = cached
+            else:
+                missing.append(video_id)
+        
+        if missing:
+            logger.debug("Video details cache miss for %d/%d videos", len(missing), len(details) + len(missing))
+        for chunk in chunked(missing, MAX_PAGE_SIZE):
+            for video in self.fetch_video_chunk(chunk):
+                details[video.id] = video
+        
+        return [details[video_id] for video_id in video_ids if video_id in details]
+    
+    def fetch_video_chunk(self, video_ids):
+        """
+        Fetch details for at most 50 video IDs in one videos.list call and
+        store them in the per-video cache.
+        
+        When the quota is low, videos with stale details are not requested
+        again.
+        
+        Returns:
+            list: VideoRecords
+        """
+        videos = []
+        if self.quota.is_low():
+            for video_id in video_ids:
+                stale = self.stale_cache.get(("video", video_id))
+                if stale is not None:
+                    videos.append(stale)
+            if videos:
+                logger.info(f"YouTube quota low, serving stale details for {len(videos)}/{len(video_ids)} videos")
+                served = {video.id for video in videos}
+                video_ids = [video_id for video_id in video_ids if video_id not in served]
+        if not video_ids:
+            return videos
+        
+        videos_response = self._execute(self.youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            id=",".join(video_ids),
+            maxResults=MAX_PAGE_SIZE
+        ), "videos.list")
+        
+        fetched = [VideoRecord.from_api(item) for item in videos_response.get('items', [])]
+        for video in fetched:
+            self.video_cache.set(video.id, video)
+            self.stale_cache.set(("video", video.id), video)
+        return videos + fetched
+    
+    def get_most_popular(self, max_results=10):
+        """
+        Fetch the mostPopular chart for the configured region.
+        
+        Returns:
+            list: VideoRecords (served from the cache when possible)
+        """
+        key = ("chart", "mostPopular", self.region, max_results)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("Most popular chart cache hit")
+            return list(cached)
+        
+        if self.quota.is_low():
+            stale = self._stale(key, "most popular chart")
+            if stale is not None:
+                return list(stale)
+        
+        videos = []
+        page_token = None
+        while len(videos) < max_results:
+            if videos and not self.quota.can_afford("videos.list"):
+                break
+            videos_response = self._execute(self.youtube.videos().list(
+                part="snippet,statistics,contentDetails",
+                chart="mostPopular",
+                regionCode=self.region,
+                maxResults=min(MAX_PAGE_SIZE, max_results - len(videos)),
+                pageToken=page_token
+            ), "videos.list")
+            
+            videos.extend(VideoRecord.from_api(item) for item in videos_response.get('items', []))
+            page_token = videos_response.get('nextPageToken')
+            if not page_token:
+                break
+        
+        for video in videos:
+            self.video_cache.set(video.id, video)
+            self.stale_cache.set(("video", video.id), video)
+        self.cache.set(key, tuple(videos))
+        self.stale_cache.set(key, tuple(videos))
+        return videos
+    
+    def analyze_engagement(self, videos, top_k=None):
+        """
+        Calculate engagement metrics for videos.
+        
+        Args:
+            videos (list): List of VideoRecords
+            top_k (int): Only return the top_k videos (all when None)
+            
+        Returns:
+            list: VideoRecords carrying engagement scores, best first
+        """
+        try:
+            if not videos:
+                return []
+            
+            views, likes, comments, published = self.scorer.columns(videos)
+            scores, recency = self.scorer.score(views, likes, comments, published)
+            order = self.scorer.rank(scores, top_k)
+            
+            # Records are shared with the caches, so attach scores to copies
+            return [
+                videos[i].with_engagement(float(scores[i]), float(recency[i]))
+                for i in order.tolist()
+            ]
+        except Exception as e:
+            logger.error(f"Error analyzing engagement: {str(e)}", exc_info=True)
+            # Return unsorted videos if error occurs
+            return videos
+
+
+class AsyncYouTubeService:
+    """
+    Awaitable facade over YouTubeService.
+    
+    The googleapiclient calls are blocking, so they run on a bounded thread
+    pool and every call is given a deadline. This keeps a slow YouTube search
+    from stalling the event loop for every other request.
+    """
+    
+    def __init__(self, service=None, max_workers=None, timeout=None, speculative=None):
+        try:
+            self.service = service or YouTubeService()
+            self.timeout = timeout or settings.YOUTUBE_REQUEST_TIMEOUT
+            self.speculative = settings.YOUTUBE_SPECULATIVE_SEARCH if speculative is None else speculative
+            self.speculative_unit_budget = settings.YOUTUBE_SPECULATIVE_UNIT_BUDGET
+            # (timestamp, units) of speculative calls made in the last hour
+            self._speculative_spend = deque()
+            self._speculative_lock = threading.Lock()
+            self.executor = ThreadPoolExecutor(
+                max_workers=max_workers or settings.YOUTUBE_MAX_WORKERS,
+                thread_name_prefix="youtube"
+            )
+            # Identical concurrent fetches share one upstream call
+            self.flight = SingleFlight(name="youtube")
+            # video_id -> future for details currently being fetched
+            self._pending_videos = {}
+            logger.info("Async YouTube service initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize async YouTube service: {str(e)}", exc_info=True)
+            raise
+    
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking service call on the executor with a deadline"""
+        loop = asyncio.get_running_loop()
+        # Run in the caller's context so logs and profile spans are attributed to its request
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self.executor, functools.partial(context.run, func, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout=self.timeout)
+    
+    async def get_trending_videos(self, category, max_results=10):
+        """
+        Fetch trending videos from YouTube without blocking the event loop.
         
         Args:
             category (str): Category or search term
             max_results (int): Maximum number of results
         
         Returns:
-            list: List of video data dictionaries
+            list: List of VideoRecords, empty on timeout
+        """
+        try:
+            key = ("trending", normalize_query(category), max_results)
+            return await self.flight.do(key, self._fetch_trending, category, max_results)
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out after {self.timeout}s fetching trending videos for category: {category}")
+            return []
+    
+    async def _fetch_trending(self, category, max_results):
+        """
+        Fetch trending videos from YouTube based on category.
+        
+        Tries the exact query, then its first word, then the mostPopular
+        chart. In speculative mode the fallbacks are started alongside the
+        exact search instead of after it; results are still picked in the
+        same priority order, and fallbacks that are no longer needed are
+        cancelled, or their results discarded if already running. Fallbacks
+        are only speculated while the hourly speculative unit budget allows
+        it and the daily quota is not running low, otherwise they run
+        sequentially.
         """
         try:
             logger.info(f"Fetching trending videos for category: {category}")
             
-            # First try searching for the exact category
-            search_response = self.youtube.search().list(
-                q=category,
-                part="id,snippet",
-                maxResults=max_results,
-                type="video",
-                order="viewCount",  # Sort by view count
-                relevanceLanguage="en"
-            ).execute()
+            words = category.split()
+            broader_term = words[0] if len(words) > 1 else None
             
-            video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
+            exact = asyncio.ensure_future(self._run(self.service.search_video_ids, category, max_results))
+            speculative = self.speculative and not self.service.quota.is_low()
+            # Searches and the chart page through results MAX_PAGE_SIZE at a time
+            pages = math.ceil(max_results / MAX_PAGE_SIZE)
+            broader = None
+            if speculative and broader_term and self._reserve_speculative_units(pages * SEARCH_UNIT_COST):
+                broader = asyncio.ensure_future(self._run(self.service.search_video_ids, broader_term, max_results))
+            chart = None
+            if speculative and self._reserve_speculative_units(pages * VIDEOS_LIST_UNIT_COST):
+                chart = asyncio.ensure_future(self._run(self.service.get_most_popular, max_results))
             
-            # If no results, try with broader category terms
-            if not video_ids and len(category.split()) > 1:
-                broader_term = category.split()[0]  # Use just the first word
-                logger.info(f"No results for '{category}', trying broader term: '{broader_term}'")
+            try:
+                video_ids = await exact
                 
-                search_response = self.youtube.search().list(
-                    q=broader_term,
-                    part="id,snippet",
-                    maxResults=max_results,
-                    type="video",
-                    order="viewCount",
-                    relevanceLanguage="en"
-                ).execute()
+                if not video_ids and broader_term:
+                    logger.info(f"No results for '{category}', trying broader term: '{broader_term}'")
+                    video_ids = await (broader or self._run(self.service.search_video_ids, broader_term, max_results))
                 
-                video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
+                if not video_ids:
+                    logger.info(f"No results for '{category}', fetching general trending videos")
+                    return await (chart or self._run(self.service.get_most_popular, max_results))
+            finally:
+                for task in (exact, broader, chart):
+                    if task is None:
+                        continue
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        task.exception()  # discard results of unused fallbacks
             
-            # If still no results, try getting generally trending videos
-            if not video_ids:
-                logger.info(f"No results for '{category}', fetching general trending videos")
-                
-                # Get videos from trending
-                videos_response = self.youtube.videos().list(
-                    part="snippet,statistics,contentDetails",
-                    chart="mostPopular",
-                    regionCode="US",  # You might want to make this dynamic based on user location
-                    maxResults=max_results
-                ).execute()
-                
-                return videos_response.get('items', [])
-            
-            # If we have video IDs, get detailed information
-            if video_ids:
-                logger.info(f"Found {len(video_ids)} videos, fetching details")
-                
-                videos_response = self.youtube.videos().list(
-                    part="snippet,statistics,contentDetails",
-                    id=",".join(video_ids)
-                ).execute()
-                
-                return videos_response.get('items', [])
+            logger.info(f"Found {len(video_ids)} videos, fetching details")
+            return await self.get_video_details(video_ids)
             
+        except asyncio.TimeoutError:
+            raise
+        except QuotaExceededError as e:
+            logger.warning(f"Skipping YouTube fetch for category '{category}': {str(e)}")
             return []
-            
         except googleapiclient.errors.HttpError as e:
             logger.error(f"YouTube API HTTP error: {str(e)}", exc_info=True)
             return []
@@ -95,56 +434,82 @@ class YouTubeService:
             logger.error(f"Error fetching trending videos: {str(e)}", exc_info=True)
             return []
     
-    def analyze_engagement(self, videos):
+    async def get_video_details(self, video_ids):
         """
-        Calculate engagement metrics for videos.
+        Hydrate video IDs with their details.
+        
+        Cached videos are returned directly. Videos another request is already
+        fetching are awaited rather than requested again, and the remaining
+        IDs are fetched in concurrent chunks of 50.
         
-        Args:
-            videos (list): List of video data from YouTube API
-            
         Returns:
-            list: Enhanced video data with engagement scores
+            list: VideoRecords in the order of video_ids
         """
-        try:
-            now = datetime.datetime.now(datetime.timezone.utc)
-            
-            for video in videos:
-                stats = video.get('statistics', {})
-                
-                # Extract metrics with safe defaults
-                views = int(stats.get('viewCount', 0))
-                likes = int(stats.get('likeCount', 0))
-                comments = int(stats.get('commentCount', 0))
-                
-                # Calculate recency (days since publication)
-                published_at = video.get('snippet', {}).get('publishedAt', '')
-                if published_at:
-                    published_date = datetime.datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-                    days_since_published = (now - published_date).days
-                    recency_score = max(0, 1 - (days_since_published / 30))  # Higher score for newer videos
-                else:
-                    recency_score = 0
-                
-                # Calculate engagement score with safe division
-                engagement_score = (
-                    views * 0.4 +
-                    likes * 0.3 +
-                    comments * 0.2 +
-                    recency_score * 100000  # Boost recency importance
-                )
-                
-                # Add engagement data to video
-                video['engagement'] = {
-                    'score': engagement_score,
-                    'views': views,
-                    'likes': likes,
-                    'comments': comments,
-                    'recency_score': recency_score
-                }
-            
-            # Sort by engagement score
-            return sorted(videos, key=lambda x: x.get('engagement', {}).get('score', 0), reverse=True)
-        except Exception as e:
-            logger.error(f"Error analyzing engagement: {str(e)}", exc_info=True)
-            # Return unsorted videos if error occurs
-            return videos
\ No newline at end of file
+        loop = asyncio.get_running_loop()
+        details = {}
+        waiting = {}
+        to_fetch = []
+        for video_id in dict.fromkeys(video_ids):
+            cached = self.service.video_cache.get(video_id)
+            if cached is not None:
+                details[video_id] = cached
+            elif video_id in self._pending_videos:
+                waiting[video_id] = self._pending_videos[video_id]
+            else:
+                future = loop.create_future()
+                self._pending_videos[video_id] = future
+                waiting[video_id] = future
+                to_fetch.append(video_id)
+        
+        if to_fetch:
+            try:
+                chunks = await asyncio.gather(*[
+                    self._run(self.service.fetch_video_chunk, chunk)
+                    for chunk in chunked(to_fetch, MAX_PAGE_SIZE)
+                ])
+                fetched = {video.id: video for chunk in chunks for video in chunk}
+                for video_id in to_fetch:
+                    self._pending_videos.pop(video_id).set_result(fetched.get(video_id))
+            except BaseException as e:
+                for video_id in to_fetch:
+                    future = self._pending_videos.pop(video_id, None)
+                    if future is not None and not future.done():
+                        if isinstance(e, asyncio.CancelledError):
+                            future.cancel()
+                        else:
+                            future.set_exception(e)
+                            future.exception()  # retrieved here, re-raised below
+                raise
+        
+        for video_id, future in waiting.items():
+            details[video_id] = await asyncio.shield(future)
+        
+        return [details[video_id] for video_id in video_ids if details.get(video_id) is not None]
+    
+    def _reserve_speculative_units(self, units):
+        """Reserve quota units for a speculative call if the hourly budget allows it"""
+        now = time.monotonic()
+        with self._speculative_lock:
+            while self._speculative_spend and self._speculative_spend[0][0] <= now - 3600:
+                self._speculative_spend.popleft()
+            spent = sum(u for _, u in self._speculative_spend)
+            if spent + units > self.speculative_unit_budget:
+                logger.debug("Speculative budget exhausted (%d/%d units)", spent, self.speculative_unit_budget)
+                return False
+            self._speculative_spend.append((now, units))
+            return True
+    
+    def quota_stats(self):
+        """Return the quota budget and stale cache metrics"""
+        return {
+            "quota": self.service.quota.stats(),
+            "stale_cache": self.service.stale_cache.stats()
+        }
+    
+    def analyze_engagement(self, videos, top_k=None):
+        """Rank videos by engagement (CPU only, safe to call on the event loop)"""
+        return self.service.analyze_engagement(videos, top_k)
+    
+    def shutdown(self):
+        """Release the worker threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,158 @@
+# app/utils/db_pool.py
+import contextvars
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.profiler import record_span
+
+logger = get_logger(__name__)
+
+# Nesting depth of _do_get in the current thread/task; QueuePool retries by
+# calling _do_get again, and only the outermost call should be timed
+_checkout_depth = contextvars.ContextVar("pool_checkout_depth", default=0)
+
+
+class PoolMetrics:
+    """
+    Counters for one connection pool.
+
+    Checkout wait time is measured around QueuePool._do_get, i.e. the time
+    spent waiting for a free connection or opening a new one. Overflow
+    events are checkouts that had to open a connection beyond pool_size,
+    timeouts are checkouts that gave up after pool_timeout, and
+    invalidations include connections discarded by pre-ping.
+    """
+
+    def __init__(self, name, slow_wait_ms=None):
+        self.name = name
+        self.slow_wait_ms = settings.DB_POOL_SLOW_WAIT_MS if slow_wait_ms is None else slow_wait_ms
+        self.engine = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def record_wait(self, wait_ms, overflowed):
+        with self._lock:
+            self.waits += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            if overflowed:
+                self.overflow_events += 1
+        if wait_ms >= self.slow_wait_ms:
+            logger.warning(f"Waited {wait_ms:.1f} ms for a connection from the {self.name} pool")
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+        logger.error(f"Timed out waiting for a connection from the {self.name} pool")
+
+    def attach(self, engine):
+        """Listen to the engine's pool events"""
+        # Keep the engine rather than the pool: dispose() replaces the pool
+        # (listeners are carried over to the new one)
+        self.engine = getattr(engine, "sync_engine", engine)
+        pool = self.engine.pool
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(pool, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+
+        @event.listens_for(pool, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            self.checkins += 1
+
+        @event.listens_for(pool, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations += 1
+
+    def stats(self):
+        """Return pool occupancy and checkout counters"""
+        pool = self.engine.pool if self.engine is not None else None
+        stats = {
+            "name": self.name,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": self.wait_ms_total / self.waits if self.waits else 0.0,
+            "wait_ms_max": self.wait_ms_max
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow())
+            })
+        return stats
+
+
+def instrumented_pool_class(base, metrics):
+    """
+    Subclass a QueuePool so every checkout is timed into metrics.
+
+    The subclass carries metrics as a class attribute so pools recreated by
+    engine.dispose() keep reporting to the same object.
+    """
+
+    def _do_get(self):
+        depth = _checkout_depth.get()
+        if depth:
+            return base._do_get(self)
+
+        token = _checkout_depth.set(depth + 1)
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            record = base._do_get(self)
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            _checkout_depth.reset(token)
+        finished = time.perf_counter()
+        self.metrics.record_wait(
+            (finished - started) * 1000,
+            self._overflow > overflow_before and self._overflow > 0
+        )
+        record_span("db", f"{self.metrics.name} pool checkout", started, finished)
+        return record
+
+    return type(f"Instrumented{base.__name__}", (base,), {"metrics": metrics, "_do_get": _do_get})
+
+
+def pool_options(url, metrics, is_async=False):
+    """
+    Engine keyword arguments for the configured pool settings.
+
+    SQLite (used for local testing) keeps SQLAlchemy's default pool, which
+    does not accept the sizing options.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return {
+        "poolclass": instrumented_pool_class(base, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
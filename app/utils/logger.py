@@ -1,13 +1,183 @@
+import atexit
+import contextvars
+import copy
+import datetime
+import json
 import logging
 import os
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from app.config import settings
 
 # Create logs directory if it doesn't exist
 os.makedirs("logs", exist_ok=True)
 
+# Listeners started by setup_logger, stopped (and drained) at shutdown
+_listeners = []
+_queue_handlers = {}
+
+# Fields of the request being handled (request_id, route, user), attached to
+# every record logged while handling it
+_log_context = contextvars.ContextVar("log_context", default=None)
+
+
+def bind_log_context(**fields):
+    """Start a log context for the current request; pass the result to reset_log_context"""
+    return _log_context.set(dict(fields))
+
+def update_log_context(**fields):
+    """Add fields to the current request's log context, if there is one"""
+    context = _log_context.get()
+    if context is not None:
+        context.update(fields)
+
+def reset_log_context(token):
+    """End the log context started by bind_log_context"""
+    _log_context.reset(token)
+
+
+def parse_sample_rates(spec):
+    """Parse "logger:rate,..." into {logger name: rate}"""
+    rates = {}
+    for part in spec.split(","):
+        if ":" in part:
+            name, rate = part.rsplit(":", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """Copy the request log context onto records (runs on the calling thread)"""
+
+    def filter(self, record):
+        context = _log_context.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a `rate` fraction of records below WARNING; warnings and errors are always kept"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line.
+
+    Besides the timestamp, level, logger and message, the request fields
+    (request_id, route, user, status, duration_ms) are included when the
+    record carries them, from the log context or from `extra`.
+    """
+
+    FIELDS = ("request_id", "route", "user", "status", "duration_ms")
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler with a bounded queue and an overflow policy.
+
+    The message is merged with its args on the calling thread, so it shows
+    the state at the time of the call; traceback formatting and the
+    stdout/file writes happen on the listener thread instead of the request
+    path. When the queue is full, records below WARNING are dropped straight
+    away; WARNING and above wait up to block_timeout seconds for space
+    before being dropped too. The number of dropped records is logged once
+    the queue has room again.
+    """
+
+    def __init__(self, log_queue, block_timeout=0.0):
+        super().__init__(log_queue)
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._unreported = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, exc_info is kept for the listener to
+        # format: the queue never leaves the process, so the record does not
+        # need to be picklable
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno < logging.WARNING or self.block_timeout <= 0:
+                self._drop()
+                return
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self._drop()
+                return
+
+        if self._unreported:
+            with self._drop_lock:
+                dropped, self._unreported = self._unreported, 0
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": record.name,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"Dropped {dropped} log records because the log queue was full"
+                }))
+            except queue.Full:
+                with self._drop_lock:
+                    self._unreported += dropped
+
+    def _drop(self):
+        with self._drop_lock:
+            self.dropped += 1
+            self._unreported += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop sentinel waits for room in a full queue"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
 def setup_logger(name, log_file, level=logging.INFO):
-    """Function to set up a logger with file and console handlers"""
+    """
+    Function to set up a logger with file and console handlers
+    
+    With LOG_ASYNC enabled (the default) the handlers sit behind a bounded
+    queue and a QueueListener thread, so log calls only enqueue the record.
+    LOG_FORMAT=json writes JSON lines with the request context, and
+    LOG_SAMPLE_RATES thins out sub-WARNING records of high-volume loggers.
+    """
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
@@ -15,8 +185,17 @@ def setup_logger(name, log_file, level=logging.INFO):
     
     # Only add handlers if not already added to avoid duplicates
     if not logger.handlers:
+        # Logger filters run on the calling thread, where the context is set
+        logger.addFilter(ContextFilter())
+        sample_rate = parse_sample_rates(settings.LOG_SAMPLE_RATES).get(name)
+        if sample_rate is not None and sample_rate < 1:
+            logger.addFilter(SamplingFilter(sample_rate))
+        
         # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        if settings.LOG_FORMAT == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         
         # Create console handler
         console_handler = logging.StreamHandler(sys.stdout)
@@ -32,12 +211,40 @@ def setup_logger(name, log_file, level=logging.INFO):
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
         
-        # Add handlers to logger
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        if settings.LOG_ASYNC:
+            # Write from a background thread, fed by a bounded queue
+            log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+            queue_handler = BoundedQueueHandler(log_queue, settings.LOG_QUEUE_BLOCK_TIMEOUT)
+            listener = DrainingQueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+            _queue_handlers[name] = queue_handler
+            logger.addHandler(queue_handler)
+        else:
+            # Add handlers to logger
+            logger.addHandler(console_handler)
+            logger.addHandler(file_handler)
     
     return logger
 
+def shutdown_logging():
+    """Stop the listener threads after writing out every queued record"""
+    while _listeners:
+        _listeners.pop().stop()
+
+def logging_stats():
+    """Queue depth and dropped record count per queued logger"""
+    return {
+        name: {
+            "queued": handler.queue.qsize(),
+            "capacity": handler.queue.maxsize,
+            "dropped": handler.dropped
+        }
+        for name, handler in _queue_handlers.items()
+    }
+
+atexit.register(shutdown_logging)
+
 # Main application logger
 app_logger = setup_logger('app', 'app.log')
 
@@ -0,0 +1,205 @@
+# app/utils/metrics.py
+import bisect
+import math
+import threading
+
+# Latency buckets in seconds, from a cache hit to a slow LLM completion
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            yield f"{name}_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class _Metric:
+    """
+    A metric family with one child per combination of label values.
+
+    Every child has its own lock, held only for the few additions of an
+    update, so concurrent requests contend only when they update the same
+    route/endpoint/model at the same instant. Looking up an existing child is
+    a plain dict read; the family lock is only taken to create one.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child for these label values (positional, in labelnames order)"""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self):
+        """Yield (sample name, label pairs, value) for every child"""
+        for values, child in list(self._children.items()):
+            yield from child.samples(self.name, tuple(zip(self.labelnames, values)))
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class MetricsRegistry:
+    """
+    In-process registry rendered in the Prometheus text exposition format.
+
+    Counters and histograms are updated on the request path. Values that
+    components already track (cache hit counters, pool occupancy, quota)
+    are read at scrape time by collectors instead, so they cost nothing
+    between scrapes.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Register (or return the already registered) counter"""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Register (or return the already registered) histogram"""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collector):
+        """
+        Add a callable run at scrape time.
+
+        It returns an iterable of (name, type, help, samples) families, where
+        samples is a list of (labels dict, value).
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """Return every metric in the text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.collect():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def cache_families(cache_stats):
+    """
+    Turn cache stats() dicts into hit, miss, ratio and size families.
+
+    Every cache in the app reports a name, a hit_ratio and a misses count;
+    hits are the sum of its *hits counters (e.g. fresh_hits + stale_hits).
+    """
+    hits, misses, ratios, sizes = [], [], [], []
+    for stats in cache_stats:
+        labels = {"cache": stats["name"]}
+        hits.append((labels, sum(value for key, value in stats.items() if key.endswith("hits"))))
+        misses.append((labels, stats.get("misses", 0)))
+        ratios.append((labels, stats["hit_ratio"]))
+        if "size" in stats:
+            sizes.append((labels, stats["size"]))
+    return [
+        ("cache_hits_total", "counter", "Cache lookups answered from the cache", hits),
+        ("cache_misses_total", "counter", "Cache lookups that missed", misses),
+        ("cache_hit_ratio", "gauge", "Hits over lookups since startup", ratios),
+        ("cache_entries", "gauge", "Entries currently held", sizes)
+    ]
+
+
+# Shared by the whole process and exposed at /metrics
+metrics = MetricsRegistry()
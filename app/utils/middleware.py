@@ -0,0 +1,122 @@
+# app/utils/middleware.py
+import asyncio
+import time
+import uuid
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from app.utils.logger import get_logger, bind_log_context, reset_log_context
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time to serve a request, body included",
+    ("method", "route")
+)
+REQUESTS_TOTAL = metrics.counter(
+    "http_requests_total",
+    "Requests served, by response status",
+    ("method", "route", "status")
+)
+
+
+def route_label(scope):
+    """
+    The matched route template (e.g. /api/trending/analyze), or the mount
+    path for static files, so the label set stays bounded.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"
+
+
+class InstrumentationMiddleware:
+    """
+    Pure ASGI middleware for request timing, access logging and error handling.
+
+    Replaces the two @app.middleware("http") layers with a single pass: the
+    request ID and route are bound to the log context, X-Process-Time and
+    X-Request-ID are added to the response start message as it goes out (the
+    body is streamed through untouched), and unhandled exceptions become a
+    500 JSON response if nothing has been sent yet. X-Process-Time measures
+    the time until the response headers are sent; the access log's
+    duration_ms and the latency histogram cover the whole response, body
+    included. With a RequestProfiler, slow requests are profiled too.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        # Optional RequestProfiler that captures slow requests
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        method = scope["method"]
+        path = scope["path"]
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        # Every record logged while handling the request carries its ID and route
+        token = bind_log_context(request_id=request_id, route=path)
+        profile_token = self.profiler.begin() if self.profiler is not None else None
+        status_code = None
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(time.perf_counter() - start_time))
+                headers.append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            logger.info("Request received: %s %s", method, path)
+            await self.app(scope, receive, send_with_headers)
+        except Exception as e:
+            process_time = time.perf_counter() - start_time
+            logger.error("Request failed in %.4f seconds: %s %s", process_time, method, path)
+            logger.error("Error: %s", e, exc_info=True)
+            if status_code is not None:
+                # The response has already started, so it cannot be replaced
+                raise
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "Internal server error"}
+            )
+            await response(scope, receive, send_with_headers)
+        finally:
+            duration = time.perf_counter() - start_time
+            duration_ms = round(duration * 1000, 2)
+            logger.info("Response sent: %s", status_code, extra={"status": status_code, "duration_ms": duration_ms})
+            route = route_label(scope)
+            REQUEST_SECONDS.labels(method, route).observe(duration)
+            REQUESTS_TOTAL.labels(method, route, status_code or 500).inc()
+            if profile_token is not None:
+                await self._profile(profile_token, start_time, {
+                    "request_id": request_id,
+                    "method": method,
+                    "route": route,
+                    "path": path,
+                    "status": status_code
+                })
+            reset_log_context(token)
+
+    async def _profile(self, profile_token, start_time, info):
+        """Save the request's profile if it was slow (the response has already been sent)"""
+        try:
+            profile = self.profiler.finish(profile_token, start_time, info)
+            if profile is not None:
+                await asyncio.to_thread(self.profiler.save, profile)
+        except Exception as e:
+            logger.error("Failed to save request profile: %s", e, exc_info=True)
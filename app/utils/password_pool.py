@@ -0,0 +1,106 @@
+# app/utils/password_pool.py
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.metrics import metrics
+from app.utils.profiler import record_span
+
+logger = get_logger(__name__)
+
+PASSWORD_HASH_SECONDS = metrics.histogram(
+    "password_hash_duration_seconds",
+    "bcrypt operations: time queued for a worker and time hashing",
+    ("operation", "stage")
+)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password hash operations are already queued"""
+
+
+class PasswordHashPool:
+    """
+    Bounded worker pool for bcrypt hashing and verification.
+
+    bcrypt deliberately burns 100-300 ms of CPU per call and releases the
+    GIL while doing so, so running it on worker threads keeps the event loop
+    free for other requests. At most `max_queue` operations may be running
+    or waiting at once; beyond that callers get PasswordPoolBusy straight
+    away instead of piling up behind a login storm.
+    """
+
+    def __init__(self, max_workers=None, max_queue=None):
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue or settings.PASSWORD_HASH_MAX_QUEUE
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms_total = 0.0
+        self.run_ms_total = 0.0
+        self.run_ms_max = 0.0
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) on the pool and return its result.
+
+        Raises:
+            PasswordPoolBusy: If max_queue operations are already pending
+        """
+        with self._lock:
+            if self.depth >= self.max_queue:
+                self.rejected += 1
+                raise PasswordPoolBusy(f"Password hashing queue is full ({self.depth} pending)")
+            self.depth += 1
+
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self.executor, functools.partial(context.run, self._timed, func, submitted, *args))
+        finally:
+            with self._lock:
+                self.depth -= 1
+
+    def _timed(self, func, submitted, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            run_ms = (finished - started) * 1000
+            operation = getattr(func, "__name__", "call")
+            PASSWORD_HASH_SECONDS.labels(operation, "wait").observe(started - submitted)
+            PASSWORD_HASH_SECONDS.labels(operation, "run").observe(finished - started)
+            record_span("bcrypt", f"{operation} (queued)", submitted, started)
+            record_span("bcrypt", operation, started, finished)
+            with self._lock:
+                self.completed += 1
+                self.wait_ms_total += (started - submitted) * 1000
+                self.run_ms_total += run_ms
+                self.run_ms_max = max(self.run_ms_max, run_ms)
+
+    def stats(self):
+        """Return queue depth, rejections and wait/run timings"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "depth": self.depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms_avg": self.wait_ms_total / self.completed if self.completed else 0.0,
+                "run_ms_avg": self.run_ms_total / self.completed if self.completed else 0.0,
+                "run_ms_max": self.run_ms_max
+            }
+
+    def shutdown(self):
+        """Release the worker threads"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,283 @@
+# app/utils/profiler.py
+import collections
+import contextvars
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from sqlalchemy import event
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Spans of the request being profiled; None when it is not profiled, so
+# record_span costs one contextvar read. The list is shared with worker
+# threads that run with a copy of the request's context.
+_spans = contextvars.ContextVar("profile_spans", default=None)
+
+# Profile IDs are file names in the profile directory
+_PROFILE_ID = re.compile(r"^[0-9]+-[A-Za-z0-9_-]{1,64}$")
+
+# Leaf frames of threads with nothing to do, left out of stack samples
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")  # idle executor worker, blocked in SimpleQueue.get
+}
+
+
+def record_span(kind, name, started, finished=None):
+    """
+    Add a timed dependency call to the current request's profile, if any.
+
+    Args:
+        kind (str): Dependency, e.g. "youtube", "llm", "db" or "bcrypt"
+        name (str): Call within the dependency (endpoint, model, statement)
+        started (float): time.perf_counter() when the call started
+        finished (float): time.perf_counter() when it finished (now if None)
+    """
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((kind, name, started, finished or time.perf_counter(), threading.current_thread().name))
+
+
+def attach_engine(engine):
+    """Record every statement executed on engine as a "db" span"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _spans.get() is not None:
+            conn.info["profile_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("profile_started", None)
+        if started is not None:
+            record_span("db", statement.split(None, 1)[0].upper() if statement else "", started)
+
+
+def _merged_ms(intervals):
+    """Milliseconds covered by the union of (start, end) intervals"""
+    covered = 0.0
+    end = None
+    for start, finish in sorted(intervals):
+        if end is None or start > end:
+            covered += finish - start
+            end = finish
+        elif finish > end:
+            covered += finish - end
+            end = finish
+    return covered * 1000
+
+
+class StackSampler:
+    """
+    Samples the stack of every thread at a fixed interval.
+
+    Samples are kept for the last `window` seconds, so when a request turns
+    out to be slow the samples taken while it ran can be pulled out. The
+    event loop and worker threads are shared, so a profile also shows what
+    concurrent requests were doing at the time.
+    """
+
+    def __init__(self, interval=0.01, window=120, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = collections.deque(maxlen=max(1, int(window / interval)))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.append((now, names.get(ident, str(ident)), ";".join(stack)))
+
+    def collapsed(self, start, end, limit=50):
+        """
+        Samples taken between two perf_counter() readings, as collapsed
+        stacks ("thread;outer;...;inner") with their sample counts, most
+        frequent first.
+        """
+        counts = collections.Counter(
+            f"{thread};{stack}" for taken, thread, stack in list(self.samples) if start <= taken <= end
+        )
+        return [{"stack": stack, "samples": count} for stack, count in counts.most_common(limit)]
+
+
+class RequestProfiler:
+    """
+    Opt-in profiler for slow requests.
+
+    While PROFILE_ENABLED is set, every request collects spans for its calls
+    to YouTube, OpenAI, the database and bcrypt. Requests slower than
+    PROFILE_THRESHOLD_MS are written to PROFILE_DIR with the time per
+    dependency, the time not covered by any span, the spans themselves and,
+    with PROFILE_STACK_SAMPLING, the stacks sampled while the request ran.
+    Only the newest PROFILE_MAX_FILES profiles are kept.
+    """
+
+    def __init__(self, enabled=None, threshold_ms=None, directory=None, max_files=None, stack_sampling=None):
+        self.enabled = settings.PROFILE_ENABLED if enabled is None else enabled
+        self.threshold_ms = settings.PROFILE_THRESHOLD_MS if threshold_ms is None else threshold_ms
+        self.directory = directory or settings.PROFILE_DIR
+        self.max_files = max_files or settings.PROFILE_MAX_FILES
+        stack_sampling = settings.PROFILE_STACK_SAMPLING if stack_sampling is None else stack_sampling
+        self.sampler = StackSampler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000) if self.enabled and stack_sampling else None
+        self.max_spans = 500
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    def start(self):
+        """Start the stack sampler, if enabled"""
+        if self.sampler is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.sampler.start()
+            logger.info(f"Stack sampling every {self.sampler.interval * 1000:.0f} ms for requests over {self.threshold_ms} ms")
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def begin(self):
+        """Start collecting spans for the current request; returns None when disabled"""
+        if not self.enabled:
+            return None
+        return _spans.set([])
+
+    def finish(self, token, started, info):
+        """
+        Stop collecting spans and build the profile if the request was slow.
+
+        Args:
+            token: Result of begin()
+            started (float): time.perf_counter() when the request started
+            info (dict): Request fields stored with the profile (request_id,
+                method, route, path, status)
+
+        Returns:
+            dict: The profile, or None if the request was fast enough
+        """
+        spans = _spans.get()
+        _spans.reset(token)
+        finished = time.perf_counter()
+        duration_ms = (finished - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return None
+
+        spans = list(spans or ())
+        breakdown = {}
+        for kind, name, span_start, span_end, thread in spans:
+            entry = breakdown.setdefault(kind, {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += (span_end - span_start) * 1000
+        for entry in breakdown.values():
+            entry["total_ms"] = round(entry["total_ms"], 1)
+
+        profile = dict(info)
+        profile.update({
+            "captured_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 1),
+            "threshold_ms": self.threshold_ms,
+            # Concurrent spans (parallel YouTube chunks) overlap, so the
+            # per-dependency totals can add up to more than the duration
+            "breakdown": breakdown,
+            "uncovered_ms": round(max(0.0, duration_ms - _merged_ms([(s[2], s[3]) for s in spans])), 1),
+            "spans": [
+                {
+                    "kind": kind,
+                    "name": name,
+                    "start_ms": round((span_start - started) * 1000, 1),
+                    "duration_ms": round((span_end - span_start) * 1000, 1),
+                    "thread": thread
+                }
+                for kind, name, span_start, span_end, thread in sorted(spans, key=lambda s: s[2])[:self.max_spans]
+            ],
+            "spans_dropped": max(0, len(spans) - self.max_spans)
+        })
+        if self.sampler is not None:
+            profile["stacks"] = self.sampler.collapsed(started, finished)
+        return profile
+
+    def save(self, profile):
+        """Write profile to the profile directory and drop the oldest beyond max_files"""
+        request_id = re.sub(r"[^A-Za-z0-9_-]", "", str(profile.get("request_id", "")))[:64] or "request"
+        profile_id = f"{time.time_ns() // 1_000_000}-{request_id}"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+                json.dump(profile, f, default=str)
+            self.captured += 1
+            files = sorted(name for name in os.listdir(self.directory) if name.endswith(".json"))
+            for name in files[:max(0, len(files) - self.max_files)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+        logger.warning(
+            f"Slow request profiled: {profile.get('method')} {profile.get('path')} took "
+            f"{profile['duration_ms']:.0f} ms (saved as {profile_id})"
+        )
+        return profile_id
+
+    def list_profiles(self):
+        """Summaries of the saved profiles, newest first"""
+        summaries = []
+        if not os.path.isdir(self.directory):
+            return summaries
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            profile = self.get_profile(name[:-len(".json")])
+            if profile is None:
+                continue
+            summaries.append({
+                "id": name[:-len(".json")],
+                "captured_at": profile.get("captured_at"),
+                "method": profile.get("method"),
+                "path": profile.get("path"),
+                "status": profile.get("status"),
+                "duration_ms": profile.get("duration_ms"),
+                "breakdown": profile.get("breakdown")
+            })
+        return summaries
+
+    def get_profile(self, profile_id):
+        """Load a saved profile by ID, or None if there is no such profile"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
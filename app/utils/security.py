@@ -121,12 +121,16 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db
 from app.models.user import User
-from app.utils.logger import get_logger
+from app.utils.logger import get_logger, update_log_context
+from app.utils.password_pool import PasswordHashPool, PasswordPoolBusy
+from app.utils.user_cache import CachedUser, user_cache
 
 # Get logger for this module
 logger = get_logger(__name__)
@@ -134,6 +138,9 @@ logger = get_logger(__name__)
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt runs here rather than on the event loop
+password_pool = PasswordHashPool()
+
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash"""
     try:
@@ -150,6 +157,26 @@ def get_password_hash(password):
         logger.error(f"Password hashing error: {str(e)}", exc_info=True)
         raise
 
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password against a hash on the password pool"""
+    try:
+        return await password_pool.run(pwd_context.verify, plain_password, hashed_password)
+    except PasswordPoolBusy:
+        raise
+    except Exception as e:
+        logger.error(f"Password verification error: {str(e)}", exc_info=True)
+        return False
+
+async def get_password_hash_async(password):
+    """Generate a password hash on the password pool"""
+    try:
+        return await password_pool.run(pwd_context.hash, password)
+    except PasswordPoolBusy:
+        raise
+    except Exception as e:
+        logger.error(f"Password hashing error: {str(e)}", exc_info=True)
+        raise
+
 def authenticate_user(db: Session, username: str, password: str):
     """Authenticate a user with username and password"""
     try:
@@ -170,6 +197,50 @@ def authenticate_user(db: Session, username: str, password: str):
         logger.error(f"Authentication error: {str(e)}", exc_info=True)
         return False
 
+async def get_user_by_username(db: AsyncSession, username: str):
+    """Look up a user by username on an async session"""
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+async def get_cached_user(db: AsyncSession, username: str):
+    """
+    Look up a user by username, served from the user cache when possible.
+    
+    Returns a CachedUser snapshot (not bound to db), or None if there is no
+    such user.
+    """
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    row = await get_user_by_username(db, username)
+    if row is None:
+        return None
+    user = CachedUser(row)
+    user_cache.set(username, user)
+    return user
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """Authenticate a user with username and password (async session)"""
+    try:
+        logger.info(f"Authentication attempt for user: {username}")
+        user = await get_user_by_username(db, username)
+        
+        if not user:
+            logger.warning(f"Authentication failed: User {username} not found")
+            return False
+            
+        if not await verify_password_async(password, user.hashed_password):
+            logger.warning(f"Authentication failed: Invalid password for user {username}")
+            return False
+            
+        logger.info(f"Authentication successful for user: {username}")
+        return user
+    except PasswordPoolBusy:
+        raise
+    except Exception as e:
+        logger.error(f"Authentication error: {str(e)}", exc_info=True)
+        return False
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a new JWT access token"""
     try:
@@ -183,7 +254,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         to_encode.update({"exp": expire})
         
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        logger.debug(f"Access token created for user: {data.get('sub', 'unknown')}")
+        logger.debug("Access token created for user: %s", data.get('sub', 'unknown'))
         
         return encoded_jwt
     except Exception as e:
@@ -206,45 +277,80 @@ def decode_access_token(token):
         logger.error(f"Token decoding error: {str(e)}", exc_info=True)
         return None
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
-    """Get the current user from the JWT token in the cookie"""
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _username_from_cookie(request: Request, credentials_exception):
+    """Return the username in the access token cookie, raising credentials_exception if invalid"""
+    # Get token from cookie
+    token = request.cookies.get("access_token")
+    if not token:
+        logger.warning("Authentication failed: No access token in cookies")
+        raise credentials_exception
+    
+    # Remove "Bearer " prefix if present
+    if token.startswith("Bearer "):
+        token = token[7:]
     
     try:
-        # Get token from cookie
-        token = request.cookies.get("access_token")
-        if not token:
-            logger.warning("Authentication failed: No access token in cookies")
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            logger.warning("Authentication failed: No username in token payload")
             raise credentials_exception
+    except JWTError as e:
+        logger.warning(f"JWT verification failed: {str(e)}")
+        raise credentials_exception
+    return username
+
+async def get_current_user_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get the current user from the JWT token in the cookie (async session)
+    
+    The user is looked up through the user cache, so steady-state requests
+    make no database round trip. Deactivated users are rejected.
+    """
+    credentials_exception = _credentials_exception()
+    
+    try:
+        username = _username_from_cookie(request, credentials_exception)
         
-        # Remove "Bearer " prefix if present
-        if token.startswith("Bearer "):
-            token = token[7:]
-        
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                logger.warning("Authentication failed: No username in token payload")
-                raise credentials_exception
-        except JWTError as e:
-            logger.warning(f"JWT verification failed: {str(e)}")
-            raise credentials_exception
-            
-        user = db.query(User).filter(User.username == username).first()
+        user = await get_cached_user(db, username)
         if user is None:
             logger.warning(f"Authentication failed: User {username} from token not found in database")
             raise credentials_exception
+        if user.is_active is False:
+            logger.warning(f"Authentication failed: User {username} is deactivated")
+            raise credentials_exception
             
-        logger.debug(f"User {username} authenticated successfully via token")
+        update_log_context(user=username)
+        logger.debug("User %s authenticated successfully via token", username)
         return user
             
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Authentication error: {str(e)}", exc_info=True)
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+
+async def get_admin_user(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Same as get_current_user_async, but only for users listed in ADMIN_USERNAMES"""
+    user = await get_current_user_async(request, db)
+    admins = {name.strip() for name in settings.ADMIN_USERNAMES.split(",") if name.strip()}
+    if user.username not in admins:
+        logger.warning(f"User {user.username} denied access to admin endpoint {request.url.path}")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
+
+async def get_optional_user(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Same as get_current_user_async, but returns None for anonymous or invalid requests"""
+    if not request.cookies.get("access_token"):
+        return None
+    try:
+        return await get_current_user_async(request, db)
+    except HTTPException:
+        return None
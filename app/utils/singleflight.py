@@ -0,0 +1,54 @@
+# app/utils/singleflight.py
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical async calls.
+
+    The first caller for a key starts the computation; callers that arrive
+    with the same key while it is still running await the same task and get
+    the same result (or exception). Once the task finishes the key is
+    forgotten, so later calls start a fresh computation.
+    """
+
+    def __init__(self, name="singleflight"):
+        self.name = name
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        """Await func(*args, **kwargs), sharing the result with concurrent callers of key"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _, key=key: self._forget(key, task))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        # Shield the shared task so one caller disconnecting does not cancel
+        # the computation for everyone else waiting on it
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self):
+        """Number of computations currently running"""
+        return len(self._calls)
+
+    def stats(self):
+        """Return started/shared counters"""
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "shared": self.shared
+        }
@@ -0,0 +1,174 @@
+# app/utils/swr.py
+import asyncio
+import time
+from collections import OrderedDict
+from app.config import settings
+from app.utils.singleflight import SingleFlight
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def parse_tier_windows(spec):
+    """
+    Parse "tier:fresh:stale,..." into {tier: (fresh_seconds, stale_seconds)}.
+
+    A "default" tier is always present.
+    """
+    windows = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        tier, fresh, stale = (piece.strip() for piece in part.split(":"))
+        windows[tier] = (float(fresh), float(stale))
+    windows.setdefault("default", (600.0, 3000.0))
+    return windows
+
+
+def parse_category_tiers(spec):
+    """Parse "category:tier,..." into {normalized category: tier}"""
+    tiers = {}
+    for part in spec.split(","):
+        if ":" not in part:
+            continue
+        category, tier = part.rsplit(":", 1)
+        tiers[" ".join(category.lower().split())] = tier.strip()
+    return tiers
+
+
+class StaleWhileRevalidateCache:
+    """
+    Async result cache with a stale-while-revalidate policy.
+
+    Each entry belongs to a tier with a fresh window and a stale window.
+    Within the fresh window the entry is served as is. For the following
+    stale window it is still served immediately, but one background refresh
+    is started (concurrent stale hits share it) and its result replaces the
+    entry for later callers. Entries older than both windows are misses and
+    must be recomputed on the request path.
+    """
+
+    def __init__(self, tier_windows=None, category_tiers=None, maxsize=None, name="swr"):
+        self.tier_windows = tier_windows or parse_tier_windows(settings.SWR_TIER_WINDOWS)
+        self.category_tiers = (
+            category_tiers if category_tiers is not None else parse_category_tiers(settings.SWR_CATEGORY_TIERS)
+        )
+        self.maxsize = maxsize or settings.SWR_MAX_ENTRIES
+        self.name = name
+        self._data = OrderedDict()  # key -> (value, stored_at, tier)
+        self.flight = SingleFlight(name=f"{name}_refresh")
+        self._refreshing = {}
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def tier_for(self, category):
+        """Tier configured for a category, "default" if none"""
+        return self.category_tiers.get(" ".join(str(category).lower().split()), "default")
+
+    def windows(self, tier):
+        """(fresh_seconds, stale_seconds) for tier"""
+        return self.tier_windows.get(tier) or self.tier_windows["default"]
+
+    def lookup(self, key):
+        """
+        Look up key without computing anything.
+
+        Returns:
+            tuple: (value, state) where state is "fresh", "stale" or "miss"
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        value, stored_at, tier = entry
+        fresh, stale = self.windows(tier)
+        age = time.monotonic() - stored_at
+        if age < fresh:
+            self._data.move_to_end(key)
+            self.fresh_hits += 1
+            return value, FRESH
+        if age < fresh + stale:
+            self._data.move_to_end(key)
+            self.stale_hits += 1
+            return value, STALE
+
+        del self._data[key]
+        self.misses += 1
+        return None, MISS
+
+    def set(self, key, value, tier="default"):
+        """Store value under key, evicting the least recently used entries if full"""
+        self._data[key] = (value, time.monotonic(), tier)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def fill(self, key, tier, func, *args):
+        """
+        Compute the value for key (shared with concurrent fills and
+        refreshes of the same key) and store it unless it is None.
+        """
+        return await self.flight.do(key, self._compute, key, tier, func, *args)
+
+    async def _compute(self, key, tier, func, *args):
+        value = await func(*args)
+        if value is not None:
+            self.set(key, value, tier)
+        return value
+
+    def revalidate(self, key, tier, func, *args):
+        """Refresh key in the background unless a refresh is already running"""
+        if key in self._refreshing:
+            return
+        task = asyncio.ensure_future(self.fill(key, tier, func, *args))
+        # Keep a reference until the task finishes so it is not garbage collected
+        self._refreshing[key] = task
+        task.add_done_callback(lambda done, key=key: self._refreshed(key, done))
+
+    def _refreshed(self, key, task):
+        self._refreshing.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.refresh_failures += 1
+            logger.error(f"Background refresh of {self.name} entry {key!r} failed: {str(task.exception())}")
+        else:
+            self.refreshes += 1
+
+    async def get(self, key, func, *args, tier="default"):
+        """
+        Return the cached value for key, refreshing it in the background if
+        it is stale, or await func(*args) on a miss.
+        """
+        value, state = self.lookup(key)
+        if state == STALE:
+            self.revalidate(key, tier, func, *args)
+        if state != MISS:
+            return value
+        return await self.fill(key, tier, func, *args)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return fresh/stale/miss counters and refresh outcomes"""
+        lookups = self.fresh_hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+            "hit_ratio": (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,65 @@
+# app/utils/user_cache.py
+from sqlalchemy import event
+from app.config import settings
+from app.models.user import User
+from app.utils.cache import TTLCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CachedUser:
+    """
+    Plain copy of the User columns the auth dependencies and pages read.
+
+    The cache outlives the request's session, so it must not hold the ORM
+    instance: a rollback expires it and the next attribute access after the
+    session closes raises DetachedInstanceError.
+    """
+
+    __slots__ = ("id", "username", "email", "full_name", "is_active")
+
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.full_name = user.full_name
+        self.is_active = user.is_active
+
+    def __repr__(self):
+        return f"<CachedUser {self.username}>"
+
+
+# Authenticated users by username, as CachedUser snapshots. Entries are
+# dropped whenever a User row is updated or deleted through the ORM in this
+# process; the short TTL bounds how long other workers can serve a user
+# changed elsewhere.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_CACHE_TTL,
+    name="users"
+)
+
+
+def invalidate_user(username):
+    """Drop a user from the cache, e.g. after changing or deactivating them outside the ORM"""
+    if username:
+        user_cache.delete(username)
+        logger.debug("Invalidated cached user: %s", username)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    invalidate_user(target.username)
+
+
+@event.listens_for(User.username, "set", active_history=True)
+def _user_renamed(target, value, old_username, initiator):
+    # A renamed user is cached under the old username
+    if isinstance(old_username, str) and old_username != value:
+        invalidate_user(old_username)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    invalidate_user(target.username)
@@ -0,0 +1,99 @@
+"""
+Measure the per-request cost of logging on the request thread.
+
+Each simulated request makes the log calls a real request makes (access log
+lines at INFO, DB session and timing lines at DEBUG). The same calls are
+timed against the synchronous console + rotating file handlers and against
+the queue-based pipeline in app/utils/logger.py.
+
+Usage: python scripts/bench_logging.py [requests]
+"""
+import sys
+import os
+import logging
+import queue
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.utils.logger import BoundedQueueHandler, DrainingQueueListener
+
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def build_handlers(log_dir, devnull):
+    formatter = logging.Formatter(FORMAT)
+    console_handler = logging.StreamHandler(devnull)
+    console_handler.setFormatter(formatter)
+    file_handler = RotatingFileHandler(os.path.join(log_dir, "bench.log"), maxBytes=10*1024*1024, backupCount=1)
+    file_handler.setFormatter(formatter)
+    return console_handler, file_handler
+
+
+def simulate_request(logger, i):
+    logger.info(f"Request received: GET /api/trending/{i}")
+    logger.debug("Database session opened")
+    logger.info(f"Analyzing trending videos for prompt: cooking {i}")
+    logger.debug("Database session closed")
+    logger.debug(f"Request processed in {0.0123:.4f} seconds: GET /api/trending/{i}")
+    logger.info("Response sent: 200")
+
+
+def run(logger, requests):
+    per_request = []
+    for i in range(requests):
+        started = time.perf_counter()
+        simulate_request(logger, i)
+        per_request.append(time.perf_counter() - started)
+    per_request.sort()
+    return per_request
+
+
+def report(label, per_request, total=None):
+    n = len(per_request)
+    mean_us = sum(per_request) / n * 1e6
+    p50_us = per_request[n // 2] * 1e6
+    p99_us = per_request[int(n * 0.99)] * 1e6
+    line = f"{label:<8} mean {mean_us:8.1f} us   p50 {p50_us:8.1f} us   p99 {p99_us:8.1f} us per request"
+    if total is not None:
+        line += f"   (all records written after {total * 1000:.0f} ms)"
+    print(line)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as devnull:
+        # Before: handlers called synchronously by the logging call
+        sync_logger = logging.getLogger("bench.sync")
+        sync_logger.propagate = False
+        sync_logger.setLevel(logging.INFO)
+        for handler in build_handlers(log_dir, devnull):
+            sync_logger.addHandler(handler)
+        report("sync", run(sync_logger, requests))
+
+        # After: the logging call only enqueues; a listener thread writes.
+        # First with room for every record, then with the default queue
+        # size, where a tight loop overflows it and the drop policy applies
+        for label, maxsize in (("queued", requests * 6), ("bounded", settings.LOG_QUEUE_SIZE)):
+            queued_logger = logging.getLogger(f"bench.{label}")
+            queued_logger.propagate = False
+            queued_logger.setLevel(logging.INFO)
+            log_queue = queue.Queue(maxsize=maxsize)
+            queue_handler = BoundedQueueHandler(log_queue, block_timeout=settings.LOG_QUEUE_BLOCK_TIMEOUT)
+            queued_logger.addHandler(queue_handler)
+            listener = DrainingQueueListener(log_queue, *build_handlers(log_dir, devnull), respect_handler_level=True)
+            listener.start()
+            started = time.perf_counter()
+            per_request = run(queued_logger, requests)
+            listener.stop()
+            report(label, per_request, time.perf_counter() - started)
+            print(f"{'':<8} queue size {maxsize}, dropped {queue_handler.dropped} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Measure the per-request overhead of the request middleware.
+
+A trivial /ping route is served through the two @app.middleware("http")
+layers the app used before (timing header + access log, each a
+BaseHTTPMiddleware) and through the single InstrumentationMiddleware in
+app/utils/middleware.py. Requests are driven straight through the ASGI
+interface, so only the framework and middleware cost is measured; log
+output is discarded.
+
+Usage: python scripts/bench_middleware.py [requests]
+"""
+import sys
+import os
+import asyncio
+import time
+import uuid
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.utils.logger import get_logger, bind_log_context, reset_log_context, shutdown_logging
+from app.utils.middleware import InstrumentationMiddleware
+
+logger = get_logger(__name__)
+
+
+def build_before():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        try:
+            response = await call_next(request)
+            process_time = time.time() - start_time
+            response.headers["X-Process-Time"] = str(process_time)
+            logger.debug("Request processed in %.4f seconds: %s %s", process_time, request.method, request.url.path)
+            return response
+        except Exception as e:
+            logger.error(f"Error: {str(e)}", exc_info=True)
+            return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        token = bind_log_context(request_id=request_id, route=request.url.path)
+        start_time = time.perf_counter()
+        try:
+            logger.info("Request received: %s %s", request.method, request.url.path)
+            response = await call_next(request)
+            duration_ms = round((time.perf_counter() - start_time) * 1000, 2)
+            logger.info("Response sent: %s", response.status_code,
+                        extra={"status": response.status_code, "duration_ms": duration_ms})
+            response.headers["X-Request-ID"] = request_id
+            return response
+        finally:
+            reset_log_context(token)
+
+    return app
+
+
+def build_after():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.add_middleware(InstrumentationMiddleware)
+    return app
+
+
+def build_bare():
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+async def call(app):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("bench", 80)
+    }
+    messages = []
+    received = []
+
+    async def receive():
+        # The request body once, then the client is gone
+        if received:
+            return {"type": "http.disconnect"}
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def run(app, requests):
+    # Warm up (builds the middleware stack on the first call)
+    for _ in range(200):
+        await call(app)
+    per_request = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await call(app)
+        per_request.append(time.perf_counter() - started)
+    per_request.sort()
+    return per_request
+
+
+def report(label, per_request):
+    n = len(per_request)
+    mean_us = sum(per_request) / n * 1e6
+    p50_us = per_request[n // 2] * 1e6
+    p99_us = per_request[int(n * 0.99)] * 1e6
+    print(f"{label:<8} mean {mean_us:8.1f} us   p50 {p50_us:8.1f} us   p99 {p99_us:8.1f} us per request")
+
+
+async def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    # Keep the comparison about the middleware, not the log writes
+    for handler in logger.handlers:
+        handler.addFilter(lambda record: False)
+
+    report("bare", await run(build_bare(), requests))
+    report("before", await run(build_before(), requests))
+    report("after", await run(build_after(), requests))
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
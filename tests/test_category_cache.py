@@ -0,0 +1,22 @@
+from app.entrypoint_agent.category_cache import CategoryCache, normalize_prompt
+
+
+def test_normalize_prompt_keeps_topical_words():
+    assert normalize_prompt("Show me the top gear videos") == "top gear"
+    assert normalize_prompt("hot sauce challenge") != normalize_prompt("sauce challenge")
+
+
+def test_similarity_tier_requires_matching_numbers():
+    cache = CategoryCache(maxsize=16, ttl=60, similarity=True, threshold=0.5)
+    cache.set("nba highlights 2023", "NBA 2023")
+    cache.set("ww2 documentary", "WW2")
+    assert cache.get("nba highlights 2024") is None
+    assert cache.get("world war 1 documentary") is None
+    assert cache.get("nba highlight 2023") == "NBA 2023"
+
+
+def test_similarity_tier_is_off_without_opt_in():
+    cache = CategoryCache(maxsize=16, ttl=60, similarity=False)
+    cache.set("minecraft speedrun", "Minecraft")
+    assert cache.get("minecraft speedruns") is None
+    assert cache.get("minecraft speedrun") == "Minecraft"
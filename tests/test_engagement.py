@@ -0,0 +1,92 @@
+import datetime
+import random
+from app.services.engagement import EngagementScorer
+from app.services.video_record import VideoRecord
+
+NOW = datetime.datetime(2024, 6, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def legacy_rank(items, now):
+    """The per-dict formula analyze_engagement used before EngagementScorer"""
+    scored = []
+    for item in items:
+        stats = item.get('statistics', {})
+        views = int(stats.get('viewCount', 0))
+        likes = int(stats.get('likeCount', 0))
+        comments = int(stats.get('commentCount', 0))
+        published_at = item.get('snippet', {}).get('publishedAt', '')
+        if published_at:
+            published_date = datetime.datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+            days_since_published = (now - published_date).days
+            recency_score = max(0, 1 - (days_since_published / 30))
+        else:
+            recency_score = 0
+        score = views * 0.4 + likes * 0.3 + comments * 0.2 + recency_score * 100000
+        scored.append((item['id'], score))
+    return sorted(scored, key=lambda entry: entry[1], reverse=True)
+
+
+def item(video_id, views=None, likes=None, comments=None, published_at=None):
+    stats = {}
+    for key, value in (("viewCount", views), ("likeCount", likes), ("commentCount", comments)):
+        if value is not None:
+            stats[key] = str(value)
+    snippet = {"title": video_id}
+    if published_at is not None:
+        snippet["publishedAt"] = published_at
+    return {"id": video_id, "snippet": snippet, "statistics": stats}
+
+
+def new_rank(items, top_k=None):
+    scorer = EngagementScorer(0.4, 0.3, 0.2, 100000, 30)
+    videos = [VideoRecord.from_api(entry) for entry in items]
+    scores, _ = scorer.score(*scorer.columns(videos), now=NOW)
+    return [(videos[i].id, float(scores[i])) for i in scorer.rank(scores, top_k).tolist()]
+
+
+def sample_items():
+    items = [
+        item("a", 1000, 10, 1, "2024-05-31T12:00:00Z"),
+        item("tie-1", 5000, 50, 5, "2024-05-01T00:00:00Z"),
+        item("b", 20, published_at="2024-05-30T00:00:00Z"),       # no likes/comments
+        item("tie-2", 5000, 50, 5, "2024-05-01T00:00:00Z"),
+        item("no-date", 90000, 900, 90),                           # no publishedAt
+        item("empty-date", 90000, 900, 90, ""),
+        item("no-stats", published_at="2024-06-01T00:00:00Z"),
+        item("future", 10, 1, 0, "2024-06-02T00:00:00Z"),
+        item("tie-3", 5000, 50, 5, "2024-05-01T00:00:00Z"),
+        item("old", 400000, 0, 0, "2023-01-01T00:00:00.5Z"),
+        item("zero"),
+    ]
+    rng = random.Random(6)
+    for i in range(200):
+        day = rng.randint(-2, 60)
+        published = NOW - datetime.timedelta(days=day, seconds=rng.randint(0, 86399))
+        items.append(item(
+            f"r{i}", rng.choice([0, 100, 1000, rng.randint(0, 10**6)]), rng.randint(0, 10**4),
+            rng.randint(0, 10**3), published.strftime("%Y-%m-%dT%H:%M:%SZ")
+        ))
+    return items
+
+
+def test_ranking_matches_legacy_formula():
+    items = sample_items()
+    assert new_rank(items) == legacy_rank(items, NOW)
+
+
+def test_ties_keep_input_order():
+    ranked = [video_id for video_id, _ in new_rank(sample_items()) if video_id.startswith("tie-")]
+    assert ranked == ["tie-1", "tie-2", "tie-3"]
+
+
+def test_top_k_is_a_prefix_of_the_full_ranking():
+    items = sample_items()
+    legacy = legacy_rank(items, NOW)
+    for top_k in (0, 1, 2, 5, 10, 50, len(items), len(items) + 5):
+        assert new_rank(items, top_k) == legacy[:top_k]
+
+
+def test_top_k_boundary_inside_a_tie():
+    items = [item(f"t{i}", 100, 0, 0, "2024-05-01T00:00:00Z") for i in range(6)]
+    items.insert(2, item("best", 900, 0, 0, "2024-05-01T00:00:00Z"))
+    assert [video_id for video_id, _ in new_rank(items, 3)] == ["best", "t0", "t1"]
@@ -0,0 +1,176 @@
+import asyncio
+import types
+import httpx
+import pytest
+from openai import RateLimitError
+from app.entrypoint_agent import llm_handler as llm_module
+from app.entrypoint_agent.llm_handler import LLMHandler
+
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return RateLimitError("Rate limit reached", response=httpx.Response(429, headers=headers, request=request), body=None)
+
+
+def completion(text):
+    return types.SimpleNamespace(
+        choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text))],
+        usage=types.SimpleNamespace(prompt_tokens=3, completion_tokens=2)
+    )
+
+
+def chunk(text):
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text))], usage=None)
+
+
+class FakeStream:
+    def __init__(self, parts, delay):
+        self.parts = list(parts)
+        self.delay = delay
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.parts:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        return chunk(self.parts.pop(0))
+
+
+class FakeClient:
+    """Stands in for AsyncOpenAI: fails with the queued errors first, then answers"""
+
+    def __init__(self, errors=(), delay=0.0, parts=("Hel", "lo")):
+        self.errors = list(errors)
+        self.delay = delay
+        self.parts = parts
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        if stream:
+            return self._tracked_stream()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return completion("".join(self.parts))
+
+    async def _tracked_stream(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            async for part in FakeStream(self.parts, self.delay):
+                yield part
+        finally:
+            self.in_flight -= 1
+
+
+def make_handler(client, max_retries=3, timeout=1.0, concurrency=8):
+    handler = LLMHandler(client=client)
+    handler.max_retries = max_retries
+    handler.retry_base_delay = 0.01
+    handler.timeout = timeout
+    handler.semaphore = asyncio.Semaphore(concurrency)
+    return handler
+
+
+async def collect(handler, **kwargs):
+    return [token async for token in handler._stream(**kwargs)]
+
+
+@pytest.fixture
+def jitter(monkeypatch):
+    """Record the bounds of every backoff draw and return the upper bound"""
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return high
+
+    monkeypatch.setattr(llm_module.random, "uniform", uniform)
+    return bounds
+
+
+def test_complete_retries_rate_limits_with_exponential_jitter(jitter):
+    client = FakeClient(errors=[rate_limit_error(), rate_limit_error()])
+    handler = make_handler(client)
+    response = asyncio.run(handler._complete(model="test"))
+    assert response.choices[0].message.content == "Hello"
+    assert client.calls == 3
+    assert jitter == [(0, 0.01), (0, 0.02)]
+
+
+def test_complete_gives_up_after_max_retries(jitter):
+    client = FakeClient(errors=[rate_limit_error() for _ in range(5)])
+    handler = make_handler(client, max_retries=2)
+    with pytest.raises(RateLimitError):
+        asyncio.run(handler._complete(model="test"))
+    assert client.calls == 3
+    assert len(jitter) == 2
+
+
+def test_backoff_honours_retry_after(monkeypatch, jitter):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(llm_module.asyncio, "sleep", sleep)
+    handler = make_handler(FakeClient(errors=[rate_limit_error(retry_after="0.5")]))
+    asyncio.run(handler._complete(model="test"))
+    assert delays == [0.5]
+
+
+def test_complete_times_out():
+    handler = make_handler(FakeClient(delay=0.5), timeout=0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(handler._complete(model="test"))
+
+
+def test_stream_deadline_covers_the_whole_response():
+    # Every chunk arrives within the timeout, the full response does not
+    handler = make_handler(FakeClient(delay=0.03, parts=["a"] * 10), timeout=0.1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(collect(handler, model="test"))
+
+
+def test_stream_retries_rate_limit_before_any_token(jitter):
+    client = FakeClient(errors=[rate_limit_error()])
+    handler = make_handler(client)
+    assert asyncio.run(collect(handler, model="test")) == ["Hel", "lo"]
+    assert client.calls == 2
+
+
+def test_complete_respects_concurrency_limit():
+    client = FakeClient(delay=0.02)
+    handler = make_handler(client, concurrency=2)
+
+    async def run():
+        await asyncio.gather(*(handler._complete(model="test") for _ in range(6)))
+
+    asyncio.run(run())
+    assert client.max_in_flight == 2
+
+
+def test_stream_holds_its_slot_until_the_stream_ends():
+    client = FakeClient(delay=0.01, parts=["a", "b", "c"])
+    handler = make_handler(client, concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(collect(handler, model="test") for _ in range(5)))
+
+    assert asyncio.run(run()) == [["a", "b", "c"]] * 5
+    assert client.max_in_flight == 2
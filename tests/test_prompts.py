@@ -0,0 +1,17 @@
+from app.entrypoint_agent.prompts import truncate_title
+
+
+def test_truncate_title_strips_tags():
+    assert truncate_title("Song Name (Official Video) #shorts", 80) == "Song Name"
+
+
+def test_truncate_title_keeps_hashtag_only_title():
+    assert truncate_title("#shorts   #viral", 80) == "#shorts #viral"
+
+
+def test_truncate_title_keeps_bracket_only_title():
+    assert truncate_title("  (Official Video) ", 80) == "(Official Video)"
+
+
+def test_truncate_title_cuts_at_word_boundary():
+    assert truncate_title("one two three four", 10) == "one two…"
@@ -0,0 +1,36 @@
+import datetime
+import time
+from app.services.quota import QuotaBudget, seconds_until_quota_reset
+
+UTC = datetime.timezone.utc
+
+
+def test_quota_resets_at_pacific_midnight():
+    # 23:00 PDT on 1 July
+    assert seconds_until_quota_reset(datetime.datetime(2024, 7, 2, 6, 0, tzinfo=UTC)) == 3600
+    # 00:30 PST on 2 January, so the next reset is 23.5 hours away
+    assert seconds_until_quota_reset(datetime.datetime(2024, 1, 2, 8, 30, tzinfo=UTC)) == 23.5 * 3600
+
+
+def test_quota_reset_across_dst_change():
+    # 20:00 PDT on 2 November 2024; clocks fall back at 02:00 on 3 November,
+    # but the next reset is midnight the same night
+    assert seconds_until_quota_reset(datetime.datetime(2024, 11, 3, 3, 0, tzinfo=UTC)) == 4 * 3600
+    # 00:00 PDT on 3 November; that day has 25 hours
+    assert seconds_until_quota_reset(datetime.datetime(2024, 11, 3, 7, 0, tzinfo=UTC)) == 25 * 3600
+
+
+def test_mark_exhausted_pauses_until_the_quota_reset_at_most():
+    budget = QuotaBudget(daily_units=1000, window=86400, low_watermark=0.2)
+    budget.mark_exhausted()
+    assert budget.remaining() == 0
+    assert budget._exhausted_until - time.monotonic() <= seconds_until_quota_reset() + 1
+
+
+def test_mark_exhausted_ends_when_the_spend_leaves_the_window():
+    budget = QuotaBudget(daily_units=1000, window=0.05, low_watermark=0.2)
+    budget.charge("search.list")
+    budget.mark_exhausted()
+    assert budget.remaining() == 0
+    time.sleep(0.06)
+    assert budget.remaining() == 1000